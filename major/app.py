@@ -1,14 +1,41 @@
 import streamlit as st
-from collections import Counter
+from streamlit.errors import StreamlitAPIException
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+import functools
 import math
-import requests 
+import os
+import time
+import detection_cache
+import detector
+import hand_memo
+import history
+import image_prep
+import layout
+import perf
+import shanten
+import simulate
+import stream
+import tiling
+import tile_engine
+from game_state import GameState
 
 # ==========================================
 # 1. 設定與 CSS 優化 (完全復原)
 # ==========================================
 st.set_page_config(page_title="台灣麻將計算機 (AI版)", layout="centered", page_icon="🀄")
 
-st.markdown("""
+# 效能量測：MAJOR_PERF=1 全開，或網址加 ?perf=1 只量自己的 session (只顯示在頁面上)；
+# 設了 MAJOR_PERF_TRACE 才把每次量測寫進該檔，訪客無法讓 server 寫檔
+PERF_ENABLED = os.environ.get("MAJOR_PERF") == "1" or st.query_params.get("perf") == "1"
+PERF_TRACE_PATH = os.environ.get("MAJOR_PERF_TRACE")
+PERF_HISTORY = 20
+if PERF_ENABLED:
+    perf.end()      # 上一次被 st.rerun() 中斷、沒走到結尾的量測直接丟棄
+    perf.begin("page")
+
+with perf.span("css"):
+    st.markdown("""
 <style>
     div.stButton > button {
         height: 3.2rem; width: 100%;
@@ -29,32 +56,55 @@ st.markdown("""
 # 2. API 設定 (修正模型版本為 v2)
 # ==========================================
 # 您的私有 API Key (來自您的截圖)
-ROBOFLOW_API_KEY = "dKsZfGd1QysNKSoaIT1m"
+ROBOFLOW_API_KEY = os.environ.get("MAJOR_ROBOFLOW_API_KEY", "dKsZfGd1QysNKSoaIT1m")
 # 修正：將 /1 改為 /2 (因為您的截圖顯示目前是 v2 版本)
-MODEL_ID = "mahjong-baq4s-c3ovv/2"
+MODEL_ID = os.environ.get("MAJOR_MODEL_ID", "mahjong-baq4s-c3ovv/2")
+# 辨識後端：roboflow (hosted) / onnx (本機 CPU，需 onnxruntime) / replay (回放錄製結果)
+DETECTOR_BACKEND = os.environ.get("MAJOR_DETECTOR_BACKEND", "roboflow")
+ONNX_MODEL_PATH = os.environ.get("MAJOR_ONNX_MODEL", os.path.join(os.path.dirname(__file__), "model.onnx"))
+ONNX_CLASS_NAMES = os.environ.get("MAJOR_ONNX_CLASSES")     # 逗號分隔；未設定時讀模型 metadata
+REPLAY_DIR = os.environ.get("MAJOR_REPLAY_DIR", os.path.join(os.path.dirname(__file__), "fixtures"))
+# 進階參數滑桿的預設門檻 (%)
+DEFAULT_CONFIDENCE = int(os.environ.get("MAJOR_CONFIDENCE", 40))
+DEFAULT_OVERLAP = int(os.environ.get("MAJOR_OVERLAP", 30))
+# 連續辨識單次最多處理的格數 (串流不會自己結束)
+LIVE_MAX_FRAMES = int(os.environ.get("MAJOR_LIVE_MAX_FRAMES", 900))
+# 連續辨識可選的串流/攝影機 (名稱=rtsp://...或攝影機編號，逗號分隔)；未設定則只能上傳影片
+LIVE_SOURCES = stream.parse_sources(os.environ.get("MAJOR_LIVE_SOURCES"))
+# 胡牌機率模擬：process 數 (0 = 在目前 process 跑) 與每次估算的時間上限 (秒)
+SIM_WORKERS = int(os.environ.get("MAJOR_SIM_WORKERS", min(4, os.cpu_count() or 1)))
+SIM_TIME_BUDGET = float(os.environ.get("MAJOR_SIM_BUDGET", 2.0))
+# 跨 session 共用的聽牌/台數快取筆數上限
+HAND_MEMO_SIZE = int(os.environ.get("MAJOR_HAND_MEMO_SIZE", 4096))
+# 算過台數的牌局紀錄檔 (未設定則不記錄)
+HISTORY_PATH = os.environ.get("MAJOR_HISTORY")
+# 上傳前先縮到模型輸入尺寸並重新壓縮 (手機照片動輒數 MB)
+UPLOAD_MAX_SIDE = int(os.environ.get("MAJOR_UPLOAD_MAX_SIDE", image_prep.MODEL_INPUT_SIZE))
+UPLOAD_JPEG_QUALITY = int(os.environ.get("MAJOR_UPLOAD_JPEG_QUALITY", image_prep.JPEG_QUALITY))
+
+# 拆牌查表整個 process 共用一份，各 session 不重建
+@st.cache_resource
+def load_hu_tables():
+    return tile_engine.load_hu_tables()
+
+tile_engine.install_hu_tables(load_hu_tables())
 
 # ==========================================
 # 3. 初始化 Session State
 # ==========================================
 default_states = {
-    'hand_tiles': [],       
-    'exposed_tiles': [],    
-    'winning_tile': None,   
-    'flower_tiles': [],     
     'input_mode': '手牌',    
-    'settings': {           
-        'is_self_draw': False, 
-        'is_dealer': False,     
-        'streak': 0,            
-        'wind_round': "東",     
-        'wind_seat': "東"       
-    }
 }
 
 for key, value in default_states.items():
     if key not in st.session_state:
         st.session_state[key] = value
 
+# 手牌/明牌/胡牌/花牌/設定都收在 GameState，增刪時同步維護張數與聽牌快取
+if 'game' not in st.session_state:
+    st.session_state.game = GameState()
+game = st.session_state.game
+
 # ==========================================
 # 4. 定義牌資料與對應表
 # ==========================================
@@ -77,365 +127,258 @@ API_MAPPING = {
     "EW": "東", "SW": "南", "WW": "西", "NW": "北", "RD": "中", "GD": "發", "WD": "白"
 }
 
+# 版面解析時花牌要分得出是哪一張
+FLOWER_MAPPING = {
+    "1S": "春", "2S": "夏", "3S": "秋", "4S": "冬", "1F": "梅", "2F": "蘭", "3F": "竹", "4F": "菊"
+}
+
 # ==========================================
 # 5. 邏輯函式
 # ==========================================
 
 def get_tile_usage(tile):
     """計算特定牌在全場(手、明、胡)已使用的張數"""
-    count = st.session_state.hand_tiles.count(tile)
-    for item in st.session_state.exposed_tiles:
-        count += item['tiles'].count(tile)
-    if st.session_state.winning_tile == tile:
-        count += 1
-    return count
+    return game.usage(tile)
 
 def get_logic_count():
     """計算胡牌邏輯總張數 (槓牌視覺4張但邏輯佔3張)"""
-    count = len(st.session_state.hand_tiles)
-    count += len(st.session_state.exposed_tiles) * 3 
-    if st.session_state.winning_tile: count += 1
-    return count
-
-def call_roboflow_api(image_file, confidence=40, overlap=30):
-    upload_url = "".join([
-        "https://detect.roboflow.com/",
-        MODEL_ID,
-        "?api_key=", ROBOFLOW_API_KEY,
-        f"&confidence={confidence}&overlap={overlap}&format=json"
-    ])
+    return game.logic_count
+
+# 同一個牌局 (不論哪個 session、輸入順序) 只算一次
+@st.cache_resource
+def get_hand_memo():
+    return hand_memo.HandMemo(max_entries=HAND_MEMO_SIZE)
 
+@perf.timed()
+def get_ting_list():
+    """檢測目前聽什麼牌"""
+    return game.ting_list(get_hand_memo().waits)
+
+@perf.timed()
+def calculate_tai():
+    return get_hand_memo().calculate_tai(game)
+
+def _concealed_counts():
+    # 手牌 + 胡牌那張的計數向量
+    counts = game.hand_counts()
+    idx = tile_engine.TILE_ID.get(game.winning_tile)
+    if idx is not None: counts[idx] += 1
+    return counts
+
+def _sets_needed():
+    # 以完整的一手 (5 面子 + 將) 為準，不由目前張數推算 (只有一對時才不會被當成已胡)
+    return 5 - len(game.exposed_tiles)
+
+def get_shanten():
+    """目前手牌的向聽數 (0 = 聽牌，-1 = 已胡)；只在張數已滿 (16 或 17) 時有意義"""
+    return shanten.shanten(_concealed_counts(), _sets_needed(), allow_seven=not game.exposed_tiles)
+
+def get_discard_advice():
+    """17 張 (含胡牌那張) 時，每種打法的向聽數與剩餘進張"""
+    return shanten.advise_discards(_concealed_counts(), game.used_vector(), _sets_needed(), allow_seven=not game.exposed_tiles)
+
+@st.cache_resource
+def get_detector():
+    # 所有 session 共用同一個後端 (連線池 / 載入一次的 ONNX 模型)
+    return detector.create_detector(
+        DETECTOR_BACKEND, api_key=ROBOFLOW_API_KEY, model_id=MODEL_ID,
+        model_path=ONNX_MODEL_PATH, class_names=ONNX_CLASS_NAMES.split(",") if ONNX_CLASS_NAMES else None,
+        fixture_dir=REPLAY_DIR, record=os.environ.get("MAJOR_REPLAY_RECORD") == "1")
+
+@st.cache_resource
+def get_detection_cache():
+    # 依圖片內容 hash 快取原始框；設定 MAJOR_DETECTION_CACHE_DIR 可另存磁碟
+    return detection_cache.DetectionCache(max_entries=64, disk_dir=os.environ.get("MAJOR_DETECTION_CACHE_DIR"))
+
+@st.cache_resource
+def get_upload_stats():
+    return image_prep.UploadStats()
+
+def prepare_upload(file_bytes):
+    return image_prep.prepare(file_bytes, max_side=UPLOAD_MAX_SIDE, quality=UPLOAD_JPEG_QUALITY)
+
+@st.cache_resource
+def get_sim_pool():
+    # 整個 server 共用；spawn 避免 fork 到 Streamlit 的執行緒，worker 啟動時先載入拆牌表。
+    # 建立時就把每個 worker 叫起來，冷啟動不算進第一次估算的時間預算
+    if SIM_WORKERS <= 0: return None
+    pool = ProcessPoolExecutor(SIM_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=tile_engine.suit_table)
+    wait([pool.submit(time.sleep, 0.1) for _ in range(SIM_WORKERS)])
+    return pool
+
+def _sim_key(draws):
+    return (tuple(game.hand_tiles), tuple(tuple(e['tiles']) for e in game.exposed_tiles),
+            tuple(game.flower_tiles), tuple(sorted(game.settings.items())), draws)
+
+def cached_win_estimate(draws):
+    """同一手牌同一巡數算過的結果 (沒有則 None)"""
+    cached = st.session_state.get('sim_result')
+    return cached[1] if cached and cached[0] == _sim_key(draws) else None
+
+@perf.timed()
+def estimate_win(draws):
+    """蒙地卡羅估算 draws 巡內自摸機率與期望台數，結果留在 session 裡"""
+    result = simulate.estimate(game, draws, executor=get_sim_pool(), in_flight=max(1, SIM_WORKERS) * 2,
+                               time_budget=SIM_TIME_BUDGET)
+    st.session_state['sim_result'] = (_sim_key(draws), result)
+    return result
+
+@st.cache_resource
+def open_history():
+    """(紀錄檔, 錯誤訊息)；目錄唯讀或不是紀錄檔時關閉紀錄，只在設定區提示"""
+    if not HISTORY_PATH: return None, None
+    try:
+        return history.HistoryStore(HISTORY_PATH), None
+    except (OSError, ValueError) as e:
+        return None, str(e)
+
+def get_history():
+    return open_history()[0]
+
+def record_history(score, lines):
+    """把這次計算寫進紀錄；同一手連按不重複記"""
+    store = get_history()
+    if store is None: return
+    rec = history.encode(game, score, lines)
+    key = b"".join(rec[name].tobytes() for name in history.RECORD.names if name != 'ts')
+    if st.session_state.get('history_last') == key: return
+    store.append(rec)
+    st.session_state['history_last'] = key
+
+@st.cache_data(max_entries=4)
+def history_stats(n):
+    # n 為目前筆數，只當快取的 key：有新紀錄才重算
+    return get_history().stats()
+
+@st.cache_resource
+def get_tiled_detector():
+    # 分塊模式：2x2 重疊切塊，共用 4 條執行緒並行送出
+    return tiling.TiledDetector(get_detector(), rows=2, cols=2, max_workers=4,
+                                max_side=UPLOAD_MAX_SIDE, quality=UPLOAD_JPEG_QUALITY)
+
+@perf.timed()
+def call_roboflow_api(image_file, confidence=40, overlap=30, tiled=False):
     try:
         filename = getattr(image_file, 'name', 'image.jpg')
         file_bytes = image_file.getvalue()
-        
-        response = requests.post(
-            upload_url,
-            files={"file": (filename, file_bytes, "image/jpeg")}
-        )
-        
-        if response.status_code != 200:
-            st.error(f"API 錯誤 ({response.status_code}): {response.text}")
-            return []
-
-        result = response.json()
-        
-        if 'predictions' in result:
-            predictions = result['predictions']
-            predictions.sort(key=lambda x: x['x'])
-            
-            detected_tiles = []
-            for p in predictions:
-                raw = p['class']
-                app_name = API_MAPPING.get(raw, raw)
-                if "萬" in app_name or "筒" in app_name or "條" in app_name or app_name in TILES["字"] or app_name in TILES["花"]:
-                    detected_tiles.append(app_name)
-            return detected_tiles
+        # 這個 session 這次呼叫的上傳量 (get_upload_stats 是全 process 共用的)
+        info = st.session_state['ai_upload'] = {}
+        if tiled:
+            # 分塊自行裁切壓縮，不再整張前處理
+            predictions = detection_cache.detect(
+                get_tiled_detector(), get_detection_cache(), file_bytes, filename, confidence=confidence, overlap=overlap,
+                info=info)
+        else:
+            predictions = detection_cache.detect(
+                get_detector(), get_detection_cache(), file_bytes, filename, confidence=confidence, overlap=overlap,
+                prepare=prepare_upload, upload_stats=get_upload_stats(), info=info)
+    except detector.DetectorError as e:
+        st.error(f"⚠️ {e}")
         return []
-
-    except Exception as e:
-        st.error(f"連線錯誤: {e}")
+    except OSError:
+        st.error("⚠️ 無法讀取這張圖片，請換一張照片")
         return []
+    return to_detected_tiles(predictions)
+
+def to_detected_tiles(predictions):
+    # 保留框的位置，全部填入時依版面拆手牌/明牌/胡牌
+    predictions = sorted(predictions, key=lambda x: x['x'])
+    detected_tiles = []
+    for p in predictions:
+        raw = p['class']
+        app_name = API_MAPPING.get(raw, raw)
+        if "萬" in app_name or "筒" in app_name or "條" in app_name or app_name in TILES["字"] or app_name in TILES["花"]:
+            detected_tiles.append({'name': app_name, 'layout_name': FLOWER_MAPPING.get(raw, app_name),
+                                   'x': p['x'], 'y': p['y'], 'width': p['width'], 'height': p['height']})
+    return detected_tiles
+
+def detect_frame(image, confidence, overlap):
+    # 連續辨識的每一格：畫面每格都不同，不經過圖片快取
+    data, scale = stream.encode_frame(image, max_side=UPLOAD_MAX_SIDE, quality=UPLOAD_JPEG_QUALITY)
+    predictions = get_detector().detect(data, "frame.jpg", confidence=confidence, overlap=overlap)
+    return to_detected_tiles(image_prep.scale_predictions(predictions, scale))
+
+def run_live_detection(source, confidence, overlap, auto_fill):
+    """逐格辨識，穩定結果有變才更新；回傳是否有填入看板"""
+    status, preview = st.empty(), st.empty()
+    filled = False
+    s = None
+    try:
+        for step in stream.run(stream.read_frames(source, max_frames=LIVE_MAX_FRAMES),
+                               lambda img: detect_frame(img, confidence, overlap)):
+            s = step['stats']
+            status.caption(f"{s['fps']:.1f} fps・送出 {s['sent']} 格 / 略過 {s['skipped']} 格 (共 {s['frames']} 格)")
+            if step['changed']:
+                st.session_state['ai_temp_result'] = step['stable']
+                preview.write("穩定結果：" + " ".join(d['name'] for d in step['stable']))
+                if auto_fill:
+                    fill_from_layout(step['stable'])
+                    filled = True
+    except (detector.DetectorError, RuntimeError) as e:
+        st.error(f"⚠️ {e}")
+    if s: st.session_state['live_stats'] = s
+    return filled
+
+def fill_from_layout(detections):
+    """依照片版面填入整局；沒找到單獨的胡牌且張數已滿 17 時，以手牌最右邊那張當胡牌"""
+    parsed = layout.parse_layout([{**d, 'name': d['layout_name']} for d in detections])
+    hand, winning = parsed['hand'], parsed['winning']
+    if winning is None and hand and len(hand) + 3 * len(parsed['exposed']) >= 17:
+        winning = parsed['rightmost']
+        hand.remove(winning)
+    game.load(hand, parsed['exposed'], winning, parsed['flowers'])
+
+@st.cache_resource
+def get_trace_writer():
+    return perf.TraceWriter(PERF_TRACE_PATH)
+
+def finish_perf(recorder):
+    """留下最近幾次給量測面板；有設定 trace 檔才寫入"""
+    record = recorder.to_record(session=st.session_state.setdefault('perf_session', os.urandom(4).hex()))
+    if PERF_TRACE_PATH: get_trace_writer().write(record)
+    runs = st.session_state.setdefault('perf_history', [])
+    runs.append(record)
+    del runs[:-PERF_HISTORY]
+
+def perf_section(name):
+    """區塊計時：整頁執行時記成一段；fragment 單獨重跑時自成一次量測"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper():
+            if not PERF_ENABLED: return fn()
+            if perf.active() is not None:
+                with perf.span(name): return fn()
+            perf.begin(f"fragment:{name}")
+            try:
+                with perf.span(name): return fn()
+            finally:
+                finish_perf(perf.end())
+        return wrapper
+    return decorate
 
 def remove_last_item():
-    if st.session_state.winning_tile:
-        st.session_state.winning_tile = None
-    elif st.session_state.hand_tiles:
-        st.session_state.hand_tiles.pop()
-    elif st.session_state.exposed_tiles:
-        st.session_state.exposed_tiles.pop()
+    game.remove_last_item()
 
 def reset_game():
-    st.session_state.hand_tiles = []
-    st.session_state.winning_tile = None
-    st.session_state.flower_tiles = []
-    st.session_state.exposed_tiles = []
+    game.reset()
     st.session_state.input_mode = '手牌'
 
 # ==========================================
-# 6. 台數計算邏輯
+# 6. UI 介面
 # ==========================================
 
-def try_remove_sets(counts):
-    available = sorted([t for t in counts if counts[t] > 0])
-    if not available: return True
-    first = available[0]
-    if counts[first] >= 3:
-        counts[first] -= 3
-        if try_remove_sets(counts): return True
-        counts[first] += 3
-    if "字" not in first:
-        try:
-            num = int(first[:-1])
-            suit = first[-1]
-            t2, t3 = f"{num+1}{suit}", f"{num+2}{suit}"
-            if counts[t2] > 0 and counts[t3] > 0:
-                counts[first]-=1; counts[t2]-=1; counts[t3]-=1
-                if try_remove_sets(counts): return True
-                counts[first]+=1; counts[t2]+=1; counts[t3]+=1
-        except: pass
-    return False
-
-def check_standard_hu(counts):
-    if sum(counts.values()) % 3 != 2: return False
-    for tile in counts:
-        if counts[tile] >= 2:
-            counts[tile] -= 2
-            if try_remove_sets(counts):
-                counts[tile] += 2
-                return True
-            counts[tile] += 2
-    return False
-
-def check_seven_pairs(counts, exposed_len):
-    if exposed_len > 0: return False
-    if sum(counts.values()) != 17: return False
-    pairs = 0
-    for t in counts:
-        if counts[t] == 2: pairs += 1
-        elif counts[t] == 4: pairs += 2
-    return pairs == 8
-
-def can_form_only_sequences(counts):
-    available = sorted([t for t in counts if counts[t] > 0])
-    if not available: return True
-    first = available[0]
-    try:
-        num = int(first[:-1])
-        suit = first[-1]
-        t2, t3 = f"{num+1}{suit}", f"{num+2}{suit}"
-        if counts[t2] > 0 and counts[t3] > 0:
-            counts[first]-=1; counts[t2]-=1; counts[t3]-=1
-            if can_form_only_sequences(counts): return True
-            counts[first]+=1; counts[t2]+=1; counts[t3]+=1
-    except: pass
-    return False
-
-def check_ping_hu(counts, flowers, exposed_list):
-    if flowers: return False
-    for item in exposed_list:
-        if item['type'] == '碰' or item['type'] == '槓': return False
-        for t in item['tiles']:
-            if "字" in t: return False
-    for t in counts:
-        if "字" in t: return False
-    for tile in counts:
-        if counts[tile] >= 2:
-            temp = counts.copy()
-            temp[tile] -= 2
-            if can_form_only_sequences(temp):
-                return True
-    return False
-
-def check_hu_logic_for_ting(temp_counts):
-    # 用於聽牌檢測的簡化版胡牌判斷
-    if sum(temp_counts.values()) % 3 != 2: return False
-    # 標準胡
-    for tile in temp_counts:
-        if temp_counts[tile] >= 2:
-            copy_counts = temp_counts.copy()
-            copy_counts[tile] -= 2
-            if try_remove_sets(copy_counts): return True
-    # 七對子 (聽牌時手牌13+1=14張)
-    if sum(temp_counts.values()) == 14:
-        pairs = 0
-        for t in temp_counts:
-            if temp_counts[t] == 2: pairs += 1
-            elif temp_counts[t] == 4: pairs += 2
-        if pairs == 7: return True
-    return False
-
-def get_ting_list():
-    """檢測目前聽什麼牌"""
-    if get_logic_count() != 16: return []
-    ting_res = []
-    base_counts = Counter(st.session_state.hand_tiles)
-    for t in ALL_CHECK_TILES:
-        # 該牌未達4張才可能聽
-        if get_tile_usage(t) < 4:
-            test_counts = base_counts.copy()
-            test_counts[t] += 1
-            if check_hu_logic_for_ting(test_counts): ting_res.append(t)
-    return ting_res
-
-def calculate_tai():
-    hand = st.session_state.hand_tiles[:]
-    win_tile = st.session_state.winning_tile
-    exposed = st.session_state.exposed_tiles
-    flowers = st.session_state.flower_tiles
-    settings = st.session_state.settings
-    
-    full_hand = hand + ([win_tile] if win_tile else [])
-    
-    # 建立全牌池（包含明牌區）用來算字刻與花色
-    exposed_flat = []
-    for item in exposed: exposed_flat.extend(item['tiles'])
-    total_pool = Counter(full_hand + exposed_flat)
-    
-    counts = Counter(full_hand)
-    details = []
-    total_tai = 0
-    
-    is_seven = check_seven_pairs(counts, len(exposed))
-    is_standard = check_standard_hu(counts.copy())
-    
-    if not (is_seven or is_standard):
-        return 0, ["❌ 尚未胡牌"]
-
-    # --- 1. 莊家與連莊 ---
-    if settings.get('is_dealer', False):
-        details.append("莊家 (1台)"); total_tai += 1
-        if settings.get('streak', 0) > 0:
-            s_tai = settings['streak'] * 2
-            details.append(f"連{settings['streak']}拉{settings['streak']} ({s_tai}台)")
-            total_tai += s_tai
-
-    # --- 2. 暗刻計算 ---
-    an_ke_pool = hand[:]
-    if settings['is_self_draw'] and win_tile:
-        an_ke_pool.append(win_tile)
-    an_ke_counts = Counter(an_ke_pool)
-    num_an_ke = sum(1 for t in an_ke_counts if an_ke_counts[t] >= 3)
-    
-    if num_an_ke == 3: details.append("三暗刻 (2台)"); total_tai += 2
-    elif num_an_ke == 4: details.append("四暗刻 (5台)"); total_tai += 5
-    elif num_an_ke >= 5: details.append("五暗刻 (8台)"); total_tai += 8
-
-    # --- 3. 牌型台數 ---
-    is_peng_peng = False
-    is_ping_hu = False
-    if is_standard:
-        exposed_all_pong = all(item['type'] in ['碰', '槓'] for item in exposed)
-        for tile in counts:
-            if counts[tile] >= 2:
-                temp = counts.copy()
-                temp[tile] -= 2
-                if all(temp[t] % 3 == 0 for t in temp) and exposed_all_pong:
-                    is_peng_peng = True
-                    break
-    if is_standard and not is_peng_peng:
-        if check_ping_hu(counts.copy(), flowers, exposed):
-            is_ping_hu = True
-
-    # --- 4. 花色台數 ---
-    all_tiles_list = full_hand + exposed_flat
-    suits = set()
-    has_honors = False
-    for t in all_tiles_list:
-        if "萬" in t: suits.add("萬")
-        elif "筒" in t: suits.add("筒")
-        elif "條" in t: suits.add("條")
-        else: has_honors = True
-
-    if len(suits) == 0 and has_honors: details.append("字一色 (16台)"); total_tai += 16
-    elif len(suits) == 1 and not has_honors: details.append("清一色 (8台)"); total_tai += 8
-    elif len(suits) == 1 and has_honors: details.append("混一色 (4台)"); total_tai += 4
-
-    if is_seven: details.append("七對子 (8台)"); total_tai += 8
-    elif is_peng_peng: details.append("碰碰胡 (4台)"); total_tai += 4
-    elif is_ping_hu: details.append("平胡 (2台)"); total_tai += 2
-
-    # --- 5. 字刻/風刻 (含明牌) ---
-    for d in ["中", "發", "白"]:
-        if total_pool[d] >= 3: details.append(f"{d}刻 (1台)"); total_tai += 1
-    if total_pool[settings['wind_round']] >= 3: details.append(f"圈風{settings['wind_round']} (1台)"); total_tai += 1
-    if total_pool[settings['wind_seat']] >= 3: details.append(f"門風{settings['wind_seat']} (1台)"); total_tai += 1
-
-    # --- 6. 自摸/門清 ---
-    if settings['is_self_draw']:
-        if not any(item['type'] in ['吃', '碰', '槓'] for item in exposed):
-            details.append("門清自摸 (3台)"); total_tai += 3
-        else: details.append("自摸 (1台)"); total_tai += 1
-
-    # --- 7. 花牌 ---
-    if flowers:
-        details.append(f"花牌x{len(flowers)} ({len(flowers)}台)"); total_tai += len(flowers)
-
-    if total_tai == 0: details.append("一般胡牌 (屁胡)")
-    return total_tai, details
+with perf.span("title"):
+    st.title("🀄 台麻計算機 (AI版)")
 
-# ==========================================
-# 7. UI 介面
-# ==========================================
-
-st.title("🀄 台麻計算機 (AI版)")
-
-with st.expander("📸 AI 拍照 / 📂 上傳辨識", expanded=False):
-    st.caption(f"目前模型: {MODEL_ID}")
-    
-    with st.expander("🛠️ 進階參數設定 (辨識不準請點我)", expanded=False):
-        col_conf, col_iou = st.columns(2)
-        conf_threshold = col_conf.slider("信心度 (Confidence)", 1, 100, 40)
-        overlap_threshold = col_iou.slider("重疊過濾 (Overlap)", 1, 100, 30)
-
-    input_source = st.radio("輸入來源", ["📸 使用相機", "📂 上傳照片"], horizontal=True, label_visibility="collapsed")
-    img_file = st.camera_input("拍照") if input_source == "📸 使用相機" else st.file_uploader("上傳照片", type=['jpg', 'jpeg', 'png'])
-
-    if 'ai_temp_result' not in st.session_state:
-        st.session_state['ai_temp_result'] = []
-
-    if img_file is not None:
-        if st.button("🚀 傳送辨識", type="primary"):
-            with st.spinner("☁️ AI 運算中..."):
-                try:
-                    result_list = call_roboflow_api(img_file, confidence=conf_threshold, overlap=overlap_threshold)
-                    if result_list:
-                        st.session_state['ai_temp_result'] = result_list
-                        st.success(f"成功辨識 {len(result_list)} 張")
-                    else:
-                        st.session_state['ai_temp_result'] = []
-                        st.warning("⚠️ 未偵測到牌，請嘗試調低「信心度」。")
-                except Exception as e:
-                    st.error(f"API 錯誤: {e}")
-
-    if st.session_state['ai_temp_result']:
-        st.write("結果：", " ".join(st.session_state['ai_temp_result']))
-        c1, c2 = st.columns(2)
-        if c1.button("📥 全部填入 (含胡)"):
-            result = st.session_state['ai_temp_result']
-            reset_game()
-            if len(result) > 1:
-                st.session_state.winning_tile = result[-1]
-                st.session_state.hand_tiles = result[:-1]
-            else:
-                st.session_state.hand_tiles = result
-            st.session_state['ai_temp_result'] = []
-            st.rerun()
-        if c2.button("📥 僅填手牌"):
-            result = st.session_state['ai_temp_result']
-            reset_game()
-            st.session_state.hand_tiles = result
-            st.session_state['ai_temp_result'] = []
-            st.rerun()
-
-# 看板
-ting_list = get_ting_list()
-with st.container(border=True):
-    col_h1, col_h2 = st.columns([3, 1])
-    col_h1.subheader("🖐️ 胡牌: " + (st.session_state.winning_tile if st.session_state.winning_tile else "?"))
-    
-    if ting_list: col_h1.warning(f"📢 聽牌：{', '.join(ting_list)}")
-    
-    if st.session_state.exposed_tiles:
-        st.caption("🔽 明牌區 (點擊 ❌ 刪除)")
-        for idx, item in enumerate(st.session_state.exposed_tiles):
-            c_exp = st.columns([4, 1])
-            c_exp[0].info(f"{item['type']}: {' '.join(item['tiles'])}")
-            if c_exp[1].button("❌", key=f"del_exp_{idx}"):
-                st.session_state.exposed_tiles.pop(idx); st.rerun()
-
-    st.divider()
-    st.write(f"🎴 手牌 ({len(st.session_state.hand_tiles)}張): " + " ".join(sorted(st.session_state.hand_tiles)))
-    if st.session_state.flower_tiles: st.write(f"🌸 花: {' '.join(st.session_state.flower_tiles)}")
-
-# 輸入區
-st.write("---")
-st.session_state.input_mode = st.radio("👇 輸入模式", ["手牌", "吃", "碰", "槓"], horizontal=True, label_visibility="collapsed")
-if st.session_state.input_mode == "吃": st.caption("💡 點擊「2萬」加入「234萬」")
-elif st.session_state.input_mode == "碰": st.caption("💡 點擊牌加入三張")
-elif st.session_state.input_mode == "槓": st.caption("💡 點擊牌加入四張 (算3張空間)")
-
-tabs = st.tabs(["🔴萬", "🔵筒", "🟢條", "⬛字", "🌸花"])
+def refresh_play_area():
+    # 只重跑看板+牌盤；台數結果在設定區的 fragment，顯示中時整頁重跑一次把舊結果清掉
+    # 這次點擊若剛好是整頁執行 (如其他區塊同時觸發)，fragment 範圍不可用，改整頁重跑
+    if st.session_state.pop('tai_shown', False): st.rerun()
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
 
 def render_pad(tiles, cat):
     cols = st.columns(5)
@@ -446,8 +389,7 @@ def render_pad(tiles, cat):
             mode = st.session_state.input_mode
             
             if cat == "花":
-                if t not in st.session_state.flower_tiles:
-                    st.session_state.flower_tiles.append(t); st.rerun()
+                if game.add_flower(t): refresh_play_area()
             else:
                 limit_reached = False
                 if mode == "手牌" and used >= 4: limit_reached = True
@@ -465,67 +407,249 @@ def render_pad(tiles, cat):
                 if limit_reached:
                     st.error(f"🛑 {t} 或其組合已達上限 (4張)！")
                 elif cur_logic < 16:
-                    if mode == "手牌": st.session_state.hand_tiles.append(t)
-                    elif mode == "碰": st.session_state.exposed_tiles.append({"type":"碰", "tiles":[t]*3})
-                    elif mode == "槓": st.session_state.exposed_tiles.append({"type":"槓", "tiles":[t]*4})
+                    if mode == "手牌": game.add_hand_tile(t)
+                    elif mode == "碰": game.add_exposed("碰", [t]*3)
+                    elif mode == "槓": game.add_exposed("槓", [t]*4)
                     elif mode == "吃":
                         num = int(t[0])
                         if num <= 7:
-                            st.session_state.exposed_tiles.append({"type":"吃", "tiles":[f"{num}{t[1]}", f"{num+1}{t[1]}", f"{num+2}{t[1]}"]})
-                    st.rerun()
+                            game.add_exposed("吃", [f"{num}{t[1]}", f"{num+1}{t[1]}", f"{num+2}{t[1]}"])
+                    refresh_play_area()
                 elif cur_logic == 16:
                     if used >= 4: st.error(f"🛑 {t} 已達上限！")
-                    else: st.session_state.winning_tile = t; st.rerun()
-
-with tabs[0]: render_pad(TILES["萬"], "萬")
-with tabs[1]: render_pad(TILES["筒"], "筒")
-with tabs[2]: render_pad(TILES["條"], "條")
-with tabs[3]: 
-    c1=st.columns(4); 
-    for i in range(4): 
-        if c1[i].button(TILES["字"][i]): 
-            if get_tile_usage(TILES["字"][i]) < 4: st.session_state.hand_tiles.append(TILES["字"][i]); st.rerun()
-            else: st.error("上限")
-    c2=st.columns(4); 
-    for i in range(4,7): 
-        if c2[i-4].button(TILES["字"][i]): 
-            if get_tile_usage(TILES["字"][i]) < 4: st.session_state.hand_tiles.append(TILES["字"][i]); st.rerun()
-            else: st.error("上限")
-with tabs[4]:
-    c1=st.columns(4)
-    for i in range(8):
-        if c1[i%4].button(TILES["花"][i]): 
-            if TILES["花"][i] not in st.session_state.flower_tiles:
-                st.session_state.flower_tiles.append(TILES["花"][i]); st.rerun()
-
-st.write("---")
-cc1, cc2 = st.columns(2)
-if cc1.button("⬅️ 退回"): remove_last_item(); st.rerun()
-if cc2.button("🗑️ 清空", type="primary"): reset_game(); st.rerun()
-
-# === 設定區 ===
-with st.expander("⚙️ 設定", expanded=True):
-    c1, c2 = st.columns(2)
-    st.session_state.settings['is_self_draw'] = c1.toggle("自摸", value=st.session_state.settings['is_self_draw'])
-    is_dealer = c2.toggle("莊家", value=st.session_state.settings['is_dealer'])
-    st.session_state.settings['is_dealer'] = is_dealer
-    
-    if is_dealer:
-        st.session_state.settings['streak'] = st.number_input("連莊數 (n)", min_value=0, step=1, value=st.session_state.settings['streak'], help="連n拉n，台數加倍")
-    else:
-        st.session_state.settings['streak'] = 0
-        
-    sc1, sc2 = st.columns(2)
-    st.session_state.settings['wind_round'] = sc1.selectbox("圈風", ["東","南","西","北"])
-    st.session_state.settings['wind_seat'] = sc2.selectbox("門風", ["東","南","西","北"])
-
-if st.button("🧮 計算台數", type="primary"):
-    if get_logic_count() != 17:
-        st.error(f"❌ 牌數錯誤：目前 {get_logic_count()} 張 (應為 17)")
-    else:
-        score, lines = calculate_tai()
-        if "❌" in lines[0]: st.error(lines[0])
+                    else: game.set_winning_tile(t); refresh_play_area()
+
+# 各區塊各自重跑 (st.fragment)，共用 session_state 裡同一個 game：
+# 點牌只重跑看板+牌盤，調設定只重跑設定區；AI 填入會改看板，才整頁重跑
+@st.fragment
+@perf_section("detection_panel")
+def detection_panel():
+    with st.expander("📸 AI 拍照 / 📂 上傳辨識", expanded=False):
+        try:
+            active_detector = get_detector()
+        except detector.DetectorError as e:
+            # 後端設定錯誤 (如缺模型檔)：只停用辨識，手動輸入照常
+            active_detector = None
+            st.error(f"⚠️ {e}")
+        if active_detector is not None:
+            api_stats = active_detector.stats.snapshot()
+            st.caption(f"目前模型: {active_detector.model_id}" + (f" ・ 延遲 p50 {api_stats['p50']:.2f}s / p95 {api_stats['p95']:.2f}s ({api_stats['calls']} 次)" if api_stats['p50'] is not None else ""))
+
+            with st.expander("🛠️ 進階參數設定 (辨識不準請點我)", expanded=False):
+                col_conf, col_iou = st.columns(2)
+                conf_threshold = col_conf.slider("信心度 (Confidence)", 1, 100, DEFAULT_CONFIDENCE)
+                overlap_threshold = col_iou.slider("重疊過濾 (Overlap)", 1, 100, DEFAULT_OVERLAP)
+                tiled_mode = st.toggle("🔍 分塊辨識 (整桌高解析度照片)", value=False, help="切成 4 塊同時辨識，小牌較準")
+
+            input_source = st.radio("輸入來源", ["📸 使用相機", "📂 上傳照片", "🎥 連續辨識"], horizontal=True, label_visibility="collapsed")
+            img_file = None
+            if input_source == "📸 使用相機": img_file = st.camera_input("拍照")
+            elif input_source == "📂 上傳照片": img_file = st.file_uploader("上傳照片", type=['jpg', 'jpeg', 'png'])
+
+            if 'ai_temp_result' not in st.session_state:
+                st.session_state['ai_temp_result'] = []
+
+            if input_source == "🎥 連續辨識":
+                # 影片檔或串流逐格讀取，畫面沒變的格不送辨識，連續數格一致才更新
+                video_file = st.file_uploader("上傳影片", type=['mp4', 'mov', 'avi', 'webm'])
+                stream_name = None
+                if LIVE_SOURCES:
+                    stream_name = st.selectbox("或串流來源", list(LIVE_SOURCES), index=None, placeholder="選擇伺服器設定的串流")
+                auto_fill = st.checkbox("結果穩定後自動填入看板", value=True)
+                source = video_file.getvalue() if video_file is not None else LIVE_SOURCES.get(stream_name)
+                if 'live_stats' in st.session_state:
+                    s = st.session_state['live_stats']
+                    st.caption(f"上次：{s['fps']:.1f} fps・送出 {s['sent']} 格 / 略過 {s['skipped']} 格 (共 {s['frames']} 格)")
+                if st.button("▶️ 開始連續辨識", type="primary", disabled=not source):
+                    if run_live_detection(source, conf_threshold, overlap_threshold, auto_fill):
+                        st.session_state['ai_temp_result'] = []
+                        st.rerun()
+
+            if img_file is not None:
+                img_key = detection_cache.image_key(img_file.getvalue(), (get_tiled_detector() if tiled_mode else get_detector()).model_id)
+                # 同一張照片只調滑桿：用快取的框在本機重算，不再連網
+                if img_key == st.session_state.get('ai_image_key') and st.session_state.get('ai_params') != (conf_threshold, overlap_threshold) and img_key in get_detection_cache():
+                    st.session_state['ai_temp_result'] = call_roboflow_api(img_file, confidence=conf_threshold, overlap=overlap_threshold, tiled=tiled_mode)
+                    st.session_state['ai_params'] = (conf_threshold, overlap_threshold)
+                if st.button("🚀 傳送辨識", type="primary"):
+                    st.session_state['ai_image_key'] = img_key
+                    st.session_state['ai_params'] = (conf_threshold, overlap_threshold)
+                    with st.spinner("☁️ AI 運算中..."):
+                        try:
+                            result_list = call_roboflow_api(img_file, confidence=conf_threshold, overlap=overlap_threshold, tiled=tiled_mode)
+                            if result_list:
+                                st.session_state['ai_temp_result'] = result_list
+                                st.success(f"成功辨識 {len(result_list)} 張")
+                                last = st.session_state.get('ai_upload') or {}
+                                if last.get('cached'): st.caption("♻️ 同一張照片已辨識過，使用快取結果 (未上傳)")
+                                elif 'sent_bytes' in last and not tiled_mode:
+                                    st.caption(f"上傳 {last['sent_bytes'] / 1024:.0f} KB (原圖 {last['original_bytes'] / 1024:.0f} KB)・耗時 {last['seconds']:.2f}s")
+                            else:
+                                st.session_state['ai_temp_result'] = []
+                                st.warning("⚠️ 未偵測到牌，請嘗試調低「信心度」。")
+                        except Exception as e:
+                            st.error(f"API 錯誤: {e}")
+
+            if st.session_state['ai_temp_result']:
+                st.write("結果：", " ".join(d['name'] for d in st.session_state['ai_temp_result']))
+                c1, c2 = st.columns(2)
+                if c1.button("📥 全部填入 (含胡)"):
+                    reset_game()
+                    fill_from_layout(st.session_state['ai_temp_result'])
+                    st.session_state['ai_temp_result'] = []
+                    st.rerun()
+                if c2.button("📥 僅填手牌"):
+                    reset_game()
+                    game.load_hand([d['name'] for d in st.session_state['ai_temp_result']])
+                    st.session_state['ai_temp_result'] = []
+                    st.rerun()
+
+@st.fragment
+@perf_section("play_area")
+def play_area():
+    # 看板
+    ting_list = get_ting_list()
+    with st.container(border=True):
+        col_h1, col_h2 = st.columns([3, 1])
+        col_h1.subheader("🖐️ 胡牌: " + (game.winning_tile if game.winning_tile else "?"))
+
+        if ting_list: col_h1.warning(f"📢 聽牌：{', '.join(ting_list)}")
+        elif get_logic_count() == 16: col_h1.caption(f"🧭 向聽數：{get_shanten()}")
+        elif get_logic_count() == 17 and get_shanten() >= 0:
+            with col_h1.expander("🧭 出牌建議", expanded=False):
+                for a in get_discard_advice()[:5]:
+                    st.write(f"打 **{a['discard']}** → 向聽 {a['shanten']}，進張 {a['live']} 張：{' '.join(a['useful'])}")
+
+        if get_logic_count() == 16 and not game.winning_tile:
+            with col_h1.expander("🎲 胡牌機率估算", expanded=False):
+                draws = st.slider("再摸幾巡", 1, 30, 10, key="sim_draws")
+                result = cached_win_estimate(draws)
+                if st.button("開始模擬", key="sim_run"):
+                    try: result = estimate_win(draws)
+                    except ValueError as e: st.error(f"❌ {e}")
+                if result:
+                    lo, hi = result['win_ci']
+                    st.write(f"{draws} 巡內自摸：**{result['win_prob']:.1%}** (95% 信賴區間 {lo:.1%} ~ {hi:.1%})")
+                    if result['expected_tai'] is not None:
+                        t_lo, t_hi = result['tai_ci']
+                        st.write(f"胡牌時期望台數：**{result['expected_tai']:.2f}** ({t_lo:.2f} ~ {t_hi:.2f})，"
+                                 f"整體期望 {result['expected_tai_overall']:.2f} 台")
+                    st.caption(f"模擬 {result['trials']:,} 局，{result['seconds']:.2f} 秒"
+                               + ("" if result['converged'] else " (未收斂，已達次數或時間上限)")
+                               + "；只計自己摸牌，不含放槍")
+
+        if game.exposed_tiles:
+            st.caption("🔽 明牌區 (點擊 ❌ 刪除)")
+            for idx, item in enumerate(game.exposed_tiles):
+                c_exp = st.columns([4, 1])
+                c_exp[0].info(f"{item['type']}: {' '.join(item['tiles'])}")
+                if c_exp[1].button("❌", key=f"del_exp_{idx}"):
+                    game.remove_exposed(idx); refresh_play_area()
+
+        st.divider()
+        st.write(f"🎴 手牌 ({len(game.hand_tiles)}張): " + " ".join(sorted(game.hand_tiles)))
+        if game.flower_tiles: st.write(f"🌸 花: {' '.join(game.flower_tiles)}")
+
+    # 輸入區
+    st.write("---")
+    st.session_state.input_mode = st.radio("👇 輸入模式", ["手牌", "吃", "碰", "槓"], horizontal=True, label_visibility="collapsed")
+    if st.session_state.input_mode == "吃": st.caption("💡 點擊「2萬」加入「234萬」")
+    elif st.session_state.input_mode == "碰": st.caption("💡 點擊牌加入三張")
+    elif st.session_state.input_mode == "槓": st.caption("💡 點擊牌加入四張 (算3張空間)")
+
+    tabs = st.tabs(["🔴萬", "🔵筒", "🟢條", "⬛字", "🌸花"])
+
+    with tabs[0]: render_pad(TILES["萬"], "萬")
+    with tabs[1]: render_pad(TILES["筒"], "筒")
+    with tabs[2]: render_pad(TILES["條"], "條")
+    with tabs[3]: 
+        c1=st.columns(4); 
+        for i in range(4): 
+            if c1[i].button(TILES["字"][i]): 
+                if get_tile_usage(TILES["字"][i]) < 4: game.add_hand_tile(TILES["字"][i]); refresh_play_area()
+                else: st.error("上限")
+        c2=st.columns(4); 
+        for i in range(4,7): 
+            if c2[i-4].button(TILES["字"][i]): 
+                if get_tile_usage(TILES["字"][i]) < 4: game.add_hand_tile(TILES["字"][i]); refresh_play_area()
+                else: st.error("上限")
+    with tabs[4]:
+        c1=st.columns(4)
+        for i in range(8):
+            if c1[i%4].button(TILES["花"][i]): 
+                if game.add_flower(TILES["花"][i]): refresh_play_area()
+
+    st.write("---")
+    cc1, cc2 = st.columns(2)
+    if cc1.button("⬅️ 退回"): remove_last_item(); refresh_play_area()
+    if cc2.button("🗑️ 清空", type="primary"): reset_game(); refresh_play_area()
+
+@st.fragment
+@perf_section("settings_panel")
+def settings_panel():
+    # === 設定區 ===
+    with st.expander("⚙️ 設定", expanded=True):
+        c1, c2 = st.columns(2)
+        game.settings['is_self_draw'] = c1.toggle("自摸", value=game.settings['is_self_draw'])
+        is_dealer = c2.toggle("莊家", value=game.settings['is_dealer'])
+        game.settings['is_dealer'] = is_dealer
+
+        if is_dealer:
+            game.settings['streak'] = st.number_input("連莊數 (n)", min_value=0, step=1, value=game.settings['streak'], help="連n拉n，台數加倍")
         else:
-            st.balloons()
-            st.success(f"### 總計：{score} 台")
-            for l in lines: st.info(l)
+            game.settings['streak'] = 0
+
+        sc1, sc2 = st.columns(2)
+        game.settings['wind_round'] = sc1.selectbox("圈風", ["東","南","西","北"])
+        game.settings['wind_seat'] = sc2.selectbox("門風", ["東","南","西","北"])
+
+    if st.button("🧮 計算台數", type="primary"):
+        st.session_state['tai_shown'] = True
+        if get_logic_count() != 17:
+            st.error(f"❌ 牌數錯誤：目前 {get_logic_count()} 張 (應為 17)")
+        else:
+            score, lines = calculate_tai()
+            if "❌" in lines[0]: st.error(lines[0])
+            else:
+                st.balloons()
+                st.success(f"### 總計：{score} 台")
+                for l in lines: st.info(l)
+                try: record_history(score, lines)
+                except (OSError, ValueError) as e: st.warning(f"⚠️ 紀錄未寫入：{e}")
+
+    store, error = open_history()
+    if error: st.warning(f"⚠️ 牌局紀錄已停用：{error}")
+    if store is not None and len(store):
+        with st.expander("📊 歷史紀錄", expanded=False):
+            stats = history_stats(len(store))
+            c1, c2, c3 = st.columns(3)
+            c1.metric("局數", f"{stats['count']:,}")
+            c2.metric("平均台數", f"{stats['avg_tai']:.2f}")
+            c3.metric("自摸率", f"{stats['self_draw_rate']:.0%}")
+            st.dataframe([{'台型': name, '次數': n, '比例': f"{n / stats['count']:.1%}"}
+                          for name, n in sorted(stats['patterns'].items(), key=lambda kv: -kv[1])], hide_index=True)
+            st.caption("聽牌寬度：" + "，".join(f"{w} 種 {n} 局" for w, n in stats['waits'].items()))
+
+@st.fragment
+def perf_panel():
+    with st.expander("⏱️ 效能量測", expanded=False):
+        st.button("🔄 更新", key="perf_refresh")    # 只重跑這個面板，顯示 fragment 重跑後的最新紀錄
+        runs = st.session_state.get('perf_history', [])
+        if not runs: return
+        last = runs[-1]
+        st.caption(f"最近一次 ({last['label']})：{last['total_ms']:.1f} ms ・ trace: {PERF_TRACE_PATH or '未寫檔'}")
+        memo = get_hand_memo().stats()
+        st.caption(f"牌局快取：{memo['entries']}/{memo['max_entries']} 筆，命中 {memo['hits']}、"
+                   f"未命中 {memo['misses']}、淘汰 {memo['evictions']}")
+        st.dataframe([{'區段': "　" * r['depth'] + r['name'], '次數': r['calls'], '總計 ms': r['total_ms'], '最長 ms': r['max_ms']}
+                      for r in last['spans']], hide_index=True)
+        st.caption("最近幾次重跑")
+        st.dataframe([{'類型': h['label'], 'ms': h['total_ms']} for h in reversed(runs)], hide_index=True)
+
+detection_panel()
+play_area()
+settings_panel()
+
+if PERF_ENABLED:
+    finish_perf(perf.end())
+    perf_panel()
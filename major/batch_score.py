@@ -0,0 +1,82 @@
+"""批次計算台數：讀 JSONL 牌局檔，多核心計算後輸出 JSONL
+
+每行輸入為一局 (欄位同 session_state)：
+    {"id": 1, "hand_tiles": [...], "exposed_tiles": [{"type": "碰", "tiles": [...]}],
+     "winning_tile": "3萬", "flower_tiles": [...], "settings": {...}}
+每行輸出：
+    {"id": 1, "tai": 5, "details": [...], "ting": [...]}
+ting 為胡牌前 (拿掉胡牌那張) 的聽牌清單；解析失敗的行輸出 {"line": n, "error": ...}。
+
+用法：
+    python major/batch_score.py hands.jsonl -o scored.jsonl --workers 8 --chunksize 500
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from dataclasses import replace
+
+import scoring
+import tile_engine
+
+
+def score_record(record):
+    """計算單一牌局，回傳可寫出的 dict"""
+    state = scoring.HandState.from_dict(record)
+    tai, details = scoring.calculate_tai(state)
+    ting = scoring.get_ting_list(replace(state, winning_tile=None))
+    out = {'tai': tai, 'details': details, 'ting': ting}
+    if 'id' in record: out = {'id': record['id'], **out}
+    return out
+
+
+def score_line(item):
+    line_no, line = item
+    try:
+        return json.dumps(score_record(json.loads(line)), ensure_ascii=False)
+    except Exception as e:
+        return json.dumps({'line': line_no, 'error': f"{type(e).__name__}: {e}"}, ensure_ascii=False)
+
+
+def iter_lines(f):
+    for line_no, line in enumerate(f, 1):
+        if line.strip(): yield line_no, line
+
+
+def run(src, dst, workers, chunksize):
+    """串流讀寫，輸出順序與輸入相同；回傳處理行數"""
+    # 先在主 process 載入拆牌表，fork 出去的 worker 直接共用
+    tile_engine.suit_table()
+    n = 0
+    if workers <= 1:
+        results = map(score_line, iter_lines(src))
+        for out in results:
+            dst.write(out + "\n"); n += 1
+        return n
+    with multiprocessing.Pool(workers, initializer=tile_engine.suit_table) as pool:
+        for out in pool.imap(score_line, iter_lines(src), chunksize=chunksize):
+            dst.write(out + "\n"); n += 1
+    return n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批次計算 JSONL 牌局的台數與聽牌")
+    parser.add_argument("input", help="輸入 JSONL 檔 (- 為 stdin)")
+    parser.add_argument("-o", "--output", default="-", help="輸出 JSONL 檔 (預設 stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="worker 數量")
+    parser.add_argument("-c", "--chunksize", type=int, default=256, help="每批送給 worker 的行數")
+    args = parser.parse_args(argv)
+
+    src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        n = run(src, dst, args.workers, args.chunksize)
+    finally:
+        if src is not sys.stdin: src.close()
+        if dst is not sys.stdout: dst.close()
+    print(f"完成 {n} 筆", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""胡牌/聽牌/台數引擎的效能基準
+
+語料 (同一個 seed 產生的內容固定)：
+    random   隨機從 136 張牌抽 17 張 (大多不胡，走提早結束的路徑)
+    winning  隨機組出的胡牌 (5 面子 + 1 將，可含字牌)
+    pure     所有單一花色 17 張胡牌 (清一色)
+    worst    pure 中拆法最多的前 N 手，台數計算要比較最多種拆法
+每手牌最後一張當作胡牌，聽牌用前 16 張。
+
+每個函式 × 語料先暖身一輪 (查表、lru_cache)，再重複 repeat 輪逐次計時，
+報告 ops/sec、p50/p99 (µs)；另跑一輪 tracemalloc 記錄峰值記憶體。
+結果存成 JSON，--compare 與舊結果比較，ops/sec 下降超過門檻即以非 0 結束。
+
+用法：
+    python major/bench_engine.py -o bench_new.json
+    python major/bench_engine.py --compare bench_old.json --threshold 0.1
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import replace
+from itertools import combinations_with_replacement
+
+import scoring
+import tile_engine
+from tile_engine import NUM_TILES
+
+SUIT_SIZE = 9
+
+
+# ==========================================
+# 1. 語料
+# ==========================================
+
+def _melds(limit):
+    """所有面子 (刻子、順子) 的計數向量，limit 為牌種數 (只取前 limit 種)"""
+    melds = []
+    for i in range(limit):
+        melds.append(((i, 3),))
+        if i < 27 and i % 9 <= 6 and i + 2 < limit:
+            melds.append(((i, 1), (i + 1, 1), (i + 2, 1)))
+    return melds
+
+
+def _to_state(counts, rng):
+    """計數向量 → HandState (隨機排列，最後一張為胡牌)"""
+    tiles = tile_engine.from_counts(counts)
+    rng.shuffle(tiles)
+    return scoring.HandState(hand_tiles=tiles[:-1], winning_tile=tiles[-1])
+
+
+def random_hands(n, rng):
+    wall = [i for i in range(NUM_TILES) for _ in range(4)]
+    out = []
+    for _ in range(n):
+        counts = [0] * NUM_TILES
+        for i in rng.sample(wall, 17): counts[i] += 1
+        out.append(_to_state(counts, rng))
+    return out
+
+
+def winning_hands(n, rng):
+    melds = _melds(NUM_TILES)
+    out = []
+    while len(out) < n:
+        counts = [0] * NUM_TILES
+        counts[rng.randrange(NUM_TILES)] += 2
+        for meld in rng.choices(melds, k=5):
+            for i, k in meld: counts[i] += k
+        if max(counts) <= 4: out.append(_to_state(counts, rng))
+    return out
+
+
+def pure_counts():
+    """所有單一花色 (萬) 17 張胡牌的計數向量，依字典序"""
+    melds = _melds(SUIT_SIZE)
+    seen = set()
+    for combo in combinations_with_replacement(range(len(melds)), 5):
+        base = [0] * SUIT_SIZE
+        for m in combo:
+            for i, k in melds[m]: base[i] += k
+        if max(base) > 4: continue
+        for p in range(SUIT_SIZE):
+            if base[p] <= 2:
+                c = base[:]; c[p] += 2
+                seen.add(tuple(c))
+    return sorted(seen)
+
+
+def _pad(suit_counts):
+    return list(suit_counts) + [0] * (NUM_TILES - SUIT_SIZE)
+
+
+def worst_counts(pure, n):
+    """拆法最多的前 n 手"""
+    return sorted(pure, key=lambda c: -len(tile_engine.decompositions(_pad(c))))[:n]
+
+
+def build_corpora(seed=0, size=2000, worst=200):
+    rng = random.Random(seed)
+    pure = pure_counts()
+    return {
+        'random': random_hands(size, rng),
+        'winning': winning_hands(size, rng),
+        'pure': [_to_state(_pad(c), rng) for c in pure],
+        'worst': [_to_state(_pad(c), rng) for c in worst_counts(pure, worst)],
+    }
+
+
+# ==========================================
+# 2. 受測函式 (輸入先轉好，只量函式本身)
+# ==========================================
+
+def _full(state):
+    return Counter(state.hand_tiles + [state.winning_tile])
+
+
+CASES = {
+    # 17 張去掉最後兩張，剩 15 張 (3 的倍數)
+    'try_remove_sets': (lambda s: Counter(s.hand_tiles[:15]), scoring.try_remove_sets),
+    'check_standard_hu': (_full, scoring.check_standard_hu),
+    'check_ping_hu': (_full, lambda c: scoring.check_ping_hu(c, [], [])),
+    'get_ting_list': (lambda s: replace(s, winning_tile=None), scoring.get_ting_list),
+    'calculate_tai': (lambda s: s, scoring.calculate_tai),
+    # 已判定胡牌、特徵已建好，只量規則表 (不胡的手 features 為 None，直接回傳 0)
+    'rule_tai': (scoring.hand_features, scoring.rule_tai),
+}
+
+
+def _percentile(sorted_ns, q):
+    return sorted_ns[min(len(sorted_ns) - 1, int(q * len(sorted_ns)))]
+
+
+def bench(fn, inputs, repeat):
+    for x in inputs: fn(x)      # 暖身
+    samples = []
+    clock = time.perf_counter_ns
+    for _ in range(repeat):
+        for x in inputs:
+            t0 = clock()
+            fn(x)
+            samples.append(clock() - t0)
+    samples.sort()
+    total = sum(samples)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    for x in inputs: fn(x)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'calls': len(samples),
+        'ops_per_sec': round(len(samples) / (total / 1e9), 1) if total else None,
+        'p50_us': round(_percentile(samples, 0.50) / 1000, 3),
+        'p99_us': round(_percentile(samples, 0.99) / 1000, 3),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run(corpora, repeat, only=None):
+    results = {}
+    for name, (prepare, fn) in CASES.items():
+        if only and name not in only: continue
+        for corpus, states in corpora.items():
+            inputs = [prepare(s) for s in states]
+            results[f"{name}/{corpus}"] = bench(fn, inputs, repeat)
+    return results
+
+
+# ==========================================
+# 3. 輸出與比較
+# ==========================================
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old, new, threshold):
+    """回傳 ops/sec 下降超過 threshold 的項目 [(key, 舊, 新, 比例)]"""
+    regressions = []
+    for field in ('seed', 'size', 'worst'):
+        if old['meta'].get(field) != new['meta'].get(field):
+            print(f"⚠️ 語料參數 {field} 不同 ({old['meta'].get(field)} vs {new['meta'].get(field)})，數字不可直接比較")
+    for key, cur in new['results'].items():
+        prev = old['results'].get(key)
+        if not prev or not prev['ops_per_sec'] or not cur['ops_per_sec']: continue
+        ratio = cur['ops_per_sec'] / prev['ops_per_sec']
+        print(f"{key:32s} {prev['ops_per_sec']:>12,.0f} → {cur['ops_per_sec']:>12,.0f} ops/s  ({ratio - 1:+.1%})")
+        if ratio < 1 - threshold: regressions.append((key, prev['ops_per_sec'], cur['ops_per_sec'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="胡牌/聽牌/台數引擎效能基準")
+    parser.add_argument("-o", "--output", help="結果 JSON 檔")
+    parser.add_argument("--compare", help="與舊的結果 JSON 比較")
+    parser.add_argument("--threshold", type=float, default=0.10, help="ops/sec 下降超過此比例視為退步")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size", type=int, default=2000, help="random / winning 語料手數")
+    parser.add_argument("--worst", type=int, default=200, help="worst 語料手數")
+    parser.add_argument("--repeat", type=int, default=3, help="每個語料重複輪數")
+    parser.add_argument("--only", nargs="*", choices=list(CASES), help="只跑指定函式")
+    args = parser.parse_args(argv)
+
+    tile_engine.suit_table()
+    corpora = build_corpora(args.seed, args.size, args.worst)
+    print("語料: " + ", ".join(f"{k} {len(v)} 手" for k, v in corpora.items()), file=sys.stderr)
+    results = run(corpora, args.repeat, args.only)
+    report = {
+        'meta': {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"), 'git': _git_rev(),
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'seed': args.seed, 'size': args.size, 'worst': args.worst, 'repeat': args.repeat,
+            'corpora': {k: len(v) for k, v in corpora.items()},
+        },
+        'results': results,
+    }
+    for key, r in results.items():
+        print(f"{key:32s} {r['ops_per_sec']:>12,.0f} ops/s  p50 {r['p50_us']:>9.2f}µs  "
+              f"p99 {r['p99_us']:>9.2f}µs  peak {r['peak_kib']:>8.1f} KiB")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        print("\n與 " + args.compare + " 比較:")
+        regressions = compare(old, report, args.threshold)
+        if regressions:
+            print(f"\n⚠️ {len(regressions)} 項退步超過 {args.threshold:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""辨識結果快取與本機門檻過濾 (不依賴 Streamlit)
+
+同一張照片只以最低信心度問一次 API，原始框依圖片內容 hash 快取 (LRU + 選用的磁碟層)；
+之後「信心度」與「重疊過濾」改在本機對快取的框重算，拉滑桿不需再連網。
+"""
+import hashlib
+import json
+import mimetypes
+import os
+import time
+
+import image_prep
+from lru import LRUCache
+
+# API 查詢用的門檻：信心度取滑桿最小值、重疊 100% 代表伺服器端不做 NMS
+CONFIDENCE_FLOOR = 1
+OVERLAP_CEILING = 100
+
+
+def image_key(file_bytes, model_id=""):
+    """圖片內容 (含模型版本) 的 hash"""
+    h = hashlib.sha256(model_id.encode("utf-8"))
+    h.update(file_bytes)
+    return h.hexdigest()
+
+
+class DetectionCache(LRUCache):
+    """原始 predictions 的 LRU 快取 (執行緒安全)，disk_dir 有值時另存 JSON 檔"""
+
+    def __init__(self, max_entries=64, disk_dir=None):
+        super().__init__(max_entries)
+        self.disk_dir = disk_dir
+        if disk_dir: os.makedirs(disk_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def get(self, key):
+        predictions = self._lookup(key)
+        if predictions is None and self.disk_dir and os.path.exists(self._path(key)):
+            try:
+                with open(self._path(key), encoding="utf-8") as f:
+                    predictions = json.load(f)
+            except (OSError, ValueError):
+                predictions = None
+            if predictions is not None: self._store(key, predictions)
+        self._count(predictions is not None)
+        return predictions
+
+    def put(self, key, predictions):
+        self._store(key, predictions)
+        if self.disk_dir:
+            tmp = self._path(key) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(predictions, f)
+            os.replace(tmp, self._path(key))
+
+
+def intersection(a, b):
+    """兩框交集面積 (Roboflow 框格式：x, y 為中心點)"""
+    iw = min(a['x'] + a['width'] / 2, b['x'] + b['width'] / 2) - max(a['x'] - a['width'] / 2, b['x'] - b['width'] / 2)
+    ih = min(a['y'] + a['height'] / 2, b['y'] + b['height'] / 2) - max(a['y'] - a['height'] / 2, b['y'] - b['height'] / 2)
+    if iw <= 0 or ih <= 0: return 0.0
+    return iw * ih
+
+
+def iou(a, b):
+    inter = intersection(a, b)
+    if not inter: return 0.0
+    return inter / (a['width'] * a['height'] + b['width'] * b['height'] - inter)
+
+
+def nms(predictions, overlap, class_agnostic=False):
+    """依信心度由高到低保留，與已保留框 IoU 超過 overlap (%) 者丟棄"""
+    threshold = overlap / 100
+    kept = []
+    for p in sorted(predictions, key=lambda p: -p['confidence']):
+        if all((not class_agnostic and k['class'] != p['class']) or iou(k, p) <= threshold for k in kept):
+            kept.append(p)
+    return kept
+
+
+def filter_predictions(predictions, confidence, overlap, class_agnostic=False):
+    """本機重算信心度門檻 (%) 與 NMS"""
+    cutoff = confidence / 100
+    return nms([p for p in predictions if p['confidence'] >= cutoff], overlap, class_agnostic)
+
+
+def detect(client, cache, file_bytes, filename="image.jpg", confidence=40, overlap=30,
+           prepare=None, upload_stats=None, info=None):
+    """查快取，沒有才以最低門檻呼叫 API；回傳依目前門檻過濾後的 predictions
+
+    prepare 為前處理函式 (如 image_prep.prepare)：上傳處理後的 JPEG，框再換回原圖座標。
+    upload_stats 有值時記錄每次上傳的位元組與端到端時間。快取 key 一律用原圖內容。
+    info 為 dict 時填入這次呼叫本身的結果：{'cached': True} 或
+    {'cached': False, 'original_bytes', 'sent_bytes', 'seconds'} (upload_stats 是整個 process 共用的)。
+    """
+    key = image_key(file_bytes, getattr(client, 'model_id', ""))
+    raw = cache.get(key)
+    if info is not None: info.update(cached=raw is not None)
+    if raw is None:
+        start = time.perf_counter()
+        if prepare is None:
+            content_type = mimetypes.guess_type(filename)[0] or "image/jpeg"
+            raw = client.detect(file_bytes, filename, confidence=CONFIDENCE_FLOOR, overlap=OVERLAP_CEILING,
+                                content_type=content_type)
+            sent = len(file_bytes)
+        else:
+            prepared = prepare(file_bytes)
+            raw = client.detect(prepared.data, os.path.splitext(filename)[0] + ".jpg",
+                                confidence=CONFIDENCE_FLOOR, overlap=OVERLAP_CEILING)
+            raw = image_prep.scale_predictions(raw, prepared.scale)
+            sent = len(prepared.data)
+        seconds = time.perf_counter() - start
+        if upload_stats is not None: upload_stats.record(len(file_bytes), sent, seconds)
+        if info is not None: info.update(original_bytes=len(file_bytes), sent_bytes=sent, seconds=seconds)
+        cache.put(key, raw)
+    return filter_predictions(raw, confidence, overlap)
@@ -0,0 +1,258 @@
+"""辨識後端 (不依賴 Streamlit)
+
+各後端介面相同：detect(file_bytes, filename, confidence, overlap, content_type) 回傳
+Roboflow 格式的 predictions，並有 model_id (快取 key 用) 與 stats (LatencyStats)。
+  - RoboflowClient：hosted API
+  - OnnxDetector：本機 ONNX Runtime CPU 推論，不需連網
+  - ReplayDetector：回放錄好的結果 (測試/離線示範用)
+由 create_detector(backend, ...) 依設定建立。
+
+同一個 RoboflowClient 由所有 session 共用：
+  - requests.Session + 連線池，省去每次上傳的 TCP/TLS 握手
+  - 連線/讀取逾時，慢回應不會無限期卡住 worker
+  - 5xx 與連線錯誤以隨機抖動的指數退避重試
+  - 記錄每次呼叫的延遲
+"""
+import ast
+import io
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import requests
+from PIL import Image, ImageOps
+from requests.adapters import HTTPAdapter
+
+from detection_cache import filter_predictions, image_key
+
+try:
+    import onnxruntime
+except ImportError:     # 選用：只有 onnx 後端需要
+    onnxruntime = None
+
+DEFAULT_BASE_URL = "https://detect.roboflow.com/"
+BACKENDS = ("roboflow", "onnx", "replay")
+
+
+class DetectorError(Exception):
+    """辨識失敗；訊息可直接顯示給使用者"""
+
+
+class LatencyStats:
+    """延遲統計 (執行緒安全)，保留最近 window 筆計算百分位數"""
+
+    def __init__(self, window=200):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+
+    def record(self, seconds, ok=True, retries=0):
+        with self._lock:
+            self.calls += 1
+            self.retries += retries
+            if ok: self._recent.append(seconds)
+            else: self.errors += 1
+
+    def snapshot(self):
+        """回傳 {'calls', 'errors', 'retries', 'p50', 'p95'} (秒)"""
+        with self._lock:
+            recent = sorted(self._recent)
+            snap = {'calls': self.calls, 'errors': self.errors, 'retries': self.retries}
+        for name, q in (('p50', 0.5), ('p95', 0.95)):
+            snap[name] = recent[min(len(recent) - 1, int(q * len(recent)))] if recent else None
+        return snap
+
+
+class RoboflowClient:
+    """Roboflow hosted detect API
+
+    base_url 可改成本機的替身伺服器做測試。
+    """
+
+    def __init__(self, api_key, model_id, base_url=DEFAULT_BASE_URL,
+                 connect_timeout=3.05, read_timeout=20, max_retries=2, backoff=0.5, pool_size=8):
+        self.api_key = api_key
+        self.model_id = model_id
+        self.url = base_url.rstrip("/") + "/" + model_id
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.stats = LatencyStats()
+        self.session = requests.Session()
+        # 重試自己做 (才能只針對 5xx 並加抖動)，adapter 只負責連線池
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _sleep_before_retry(self, attempt):
+        # full jitter：0 ~ backoff * 2^attempt 之間隨機
+        time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def detect(self, file_bytes, filename="image.jpg", confidence=40, overlap=30, content_type="image/jpeg"):
+        """上傳圖片，回傳原始 predictions list；失敗時丟 DetectorError"""
+        params = {
+            "api_key": self.api_key, "confidence": confidence,
+            "overlap": overlap, "format": "json",
+        }
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(
+                    self.url, params=params, timeout=self.timeout,
+                    files={"file": (filename, file_bytes, content_type)},
+                )
+            except (requests.ConnectionError, requests.ConnectTimeout) as e:
+                if attempt < self.max_retries:
+                    self._sleep_before_retry(attempt); attempt += 1
+                    continue
+                self.stats.record(time.perf_counter() - start, ok=False, retries=attempt)
+                raise DetectorError("無法連線到辨識伺服器，請檢查網路後再試一次") from e
+            except requests.Timeout as e:
+                self.stats.record(time.perf_counter() - start, ok=False, retries=attempt)
+                raise DetectorError(f"辨識伺服器回應逾時 (>{self.timeout[1]} 秒)") from e
+
+            if response.status_code >= 500 and attempt < self.max_retries:
+                self._sleep_before_retry(attempt); attempt += 1
+                continue
+            break
+
+        elapsed = time.perf_counter() - start
+        if response.status_code != 200:
+            self.stats.record(elapsed, ok=False, retries=attempt)
+            if response.status_code >= 500:
+                raise DetectorError(f"辨識伺服器暫時無法使用 ({response.status_code})，請稍後再試")
+            raise DetectorError(f"API 錯誤 ({response.status_code}): {response.text[:200]}")
+        try:
+            result = response.json()
+        except ValueError as e:
+            self.stats.record(elapsed, ok=False, retries=attempt)
+            raise DetectorError("辨識伺服器回傳格式錯誤") from e
+        self.stats.record(elapsed, retries=attempt)
+        return result.get('predictions', [])
+
+    def close(self):
+        self.session.close()
+
+
+# ==========================================
+# 本機 ONNX 推論
+# ==========================================
+class OnnxDetector:
+    """YOLOv8 匯出的 ONNX 模型 (輸出 (1, 4 + 類別數, N))，CPU 推論
+
+    InferenceSession 建立一次後可多執行緒共用。class_names 未給時讀模型 metadata 的 names
+    (ultralytics 匯出會寫入)。信心度/NMS 和 hosted API 一樣在這裡套用。
+    """
+
+    def __init__(self, model_path, class_names=None, threads=0):
+        if onnxruntime is None:
+            raise DetectorError("本機辨識需要安裝 onnxruntime (pip install onnxruntime)")
+        if not os.path.exists(model_path):
+            raise DetectorError(f"找不到模型檔: {model_path}")
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        shape = self.session.get_inputs()[0].shape
+        self.input_size = shape[2] if isinstance(shape[2], int) else 640
+        if class_names is None:
+            names = self.session.get_modelmeta().custom_metadata_map.get("names")
+            if not names: raise DetectorError("模型沒有類別名稱，請設定 class_names")
+            names = ast.literal_eval(names)
+            class_names = [names[i] for i in sorted(names)] if isinstance(names, dict) else list(names)
+        self.class_names = list(class_names)
+        self.model_id = f"onnx:{os.path.basename(model_path)}"
+        self.stats = LatencyStats()
+
+    def _letterbox(self, file_bytes):
+        """等比縮放後補邊成正方形，回傳 (NCHW float32, 縮放比, x 補邊, y 補邊)"""
+        with Image.open(io.BytesIO(file_bytes)) as img:
+            img = ImageOps.exif_transpose(img)
+            if img.mode != "RGB": img = img.convert("RGB")
+            ratio = self.input_size / max(img.size)
+            w, h = round(img.width * ratio), round(img.height * ratio)
+            canvas = Image.new("RGB", (self.input_size, self.input_size), (114, 114, 114))
+            pad_x, pad_y = (self.input_size - w) // 2, (self.input_size - h) // 2
+            canvas.paste(img.resize((w, h), Image.BILINEAR), (pad_x, pad_y))
+        tensor = np.asarray(canvas, dtype=np.float32).transpose(2, 0, 1)[None] / 255.0
+        return tensor, ratio, pad_x, pad_y
+
+    def detect(self, file_bytes, filename="image.jpg", confidence=40, overlap=30, content_type="image/jpeg"):
+        start = time.perf_counter()
+        tensor, ratio, pad_x, pad_y = self._letterbox(file_bytes)
+        try:
+            output = self.session.run(None, {self.input_name: tensor})[0][0]
+        except Exception as e:
+            self.stats.record(time.perf_counter() - start, ok=False)
+            raise DetectorError(f"本機辨識失敗: {e}") from e
+        if output.shape[0] == 4 + len(self.class_names): output = output.T     # → (N, 4 + 類別數)
+        scores = output[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        conf = scores[np.arange(len(scores)), class_ids]
+        keep = conf >= confidence / 100
+        predictions = []
+        for (cx, cy, w, h), cid, c in zip(output[keep, :4], class_ids[keep], conf[keep]):
+            predictions.append({
+                'x': float((cx - pad_x) / ratio), 'y': float((cy - pad_y) / ratio),
+                'width': float(w / ratio), 'height': float(h / ratio),
+                'confidence': float(c), 'class': self.class_names[cid], 'class_id': int(cid),
+            })
+        predictions = filter_predictions(predictions, confidence, overlap)
+        self.stats.record(time.perf_counter() - start)
+        return predictions
+
+
+# ==========================================
+# 錄製 / 回放
+# ==========================================
+class ReplayDetector:
+    """依圖片內容 hash 回放 fixture_dir/<hash>.json 的原始 predictions
+
+    record_with 給另一個後端時，沒有錄製結果就呼叫它並存檔 (以最低門檻錄製，
+    回放時再套用信心度/NMS，行為與 hosted API 相同)。
+    """
+
+    def __init__(self, fixture_dir, record_with=None):
+        self.fixture_dir = fixture_dir
+        self.record_with = record_with
+        self.model_id = f"replay:{os.path.abspath(fixture_dir)}"
+        self.stats = LatencyStats()
+        if record_with is not None: os.makedirs(fixture_dir, exist_ok=True)
+
+    def _path(self, file_bytes):
+        return os.path.join(self.fixture_dir, f"{image_key(file_bytes)}.json")
+
+    def detect(self, file_bytes, filename="image.jpg", confidence=40, overlap=30, content_type="image/jpeg"):
+        start = time.perf_counter()
+        path = self._path(file_bytes)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                raw = json.load(f)
+        elif self.record_with is not None:
+            raw = self.record_with.detect(file_bytes, filename, confidence=1, overlap=100, content_type=content_type)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(raw, f)
+        else:
+            self.stats.record(time.perf_counter() - start, ok=False)
+            raise DetectorError(f"沒有這張圖片的錄製結果 ({os.path.basename(path)})")
+        self.stats.record(time.perf_counter() - start)
+        return filter_predictions(raw, confidence, overlap)
+
+
+def create_detector(backend="roboflow", api_key=None, model_id=None, base_url=DEFAULT_BASE_URL,
+                    model_path=None, class_names=None, threads=0, fixture_dir=None, record=False):
+    """依設定建立後端；replay 搭配 record=True 時以 hosted API 錄製缺少的結果"""
+    if backend == "roboflow":
+        return RoboflowClient(api_key, model_id, base_url)
+    if backend == "onnx":
+        return OnnxDetector(model_path, class_names, threads)
+    if backend == "replay":
+        return ReplayDetector(fixture_dir, RoboflowClient(api_key, model_id, base_url) if record else None)
+    raise DetectorError(f"未知的辨識後端: {backend} (可用: {', '.join(BACKENDS)})")
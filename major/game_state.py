@@ -0,0 +1,129 @@
+"""放在 session_state 裡的牌局物件：增刪牌時同步維護張數統計與聽牌快取"""
+from collections import Counter
+
+import tile_engine
+from scoring import DEFAULT_SETTINGS
+from tile_engine import NUM_TILES, TILE_ID, TILE_NAMES
+
+
+class GameState:
+    """牌局狀態
+
+    屬性名稱與 scoring 的牌局物件相同，可直接傳給 scoring.calculate_tai。
+    hand_tiles 等 list 只供讀取，增刪一律走方法，才能維持：
+      - 各牌全場使用張數 (手、明、胡)，usage() 為 O(1)
+      - 胡牌邏輯張數 logic_count
+      - 手牌計數向量與聽牌快取，只有手牌變動時才重算
+    """
+
+    def __init__(self, settings=None):
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.reset()
+
+    def reset(self):
+        """清空牌 (設定保留)"""
+        self.hand_tiles = []
+        self.exposed_tiles = []
+        self.winning_tile = None
+        self.flower_tiles = []
+        self.logic_count = 0
+        self._used = [0] * NUM_TILES
+        self._hand = [0] * NUM_TILES
+        self._extra = Counter()     # 手牌中不在 34 種內的名稱 (AI 填入的「花」等)
+        self._waits = None          # 手牌的聽牌編號 (不含全場張數過濾)
+
+    # --- 內部計數 ---
+    def _track(self, tiles, sign, in_hand):
+        for t in tiles:
+            idx = TILE_ID.get(t)
+            if idx is None:
+                if in_hand: self._extra[t] += sign
+                continue
+            self._used[idx] += sign
+            if in_hand: self._hand[idx] += sign
+        if in_hand: self._waits = None
+
+    # --- 查詢 ---
+    def usage(self, tile):
+        """特定牌在全場(手、明、胡)已使用的張數"""
+        idx = TILE_ID.get(tile)
+        if idx is not None: return self._used[idx]
+        count = self._extra[tile] + (self.winning_tile == tile)
+        for item in self.exposed_tiles: count += item['tiles'].count(tile)
+        return count
+
+    def used_vector(self):
+        return list(self._used)
+
+    def hand_counts(self):
+        """手牌計數向量 (與 tile_engine.to_counts(hand_tiles) 相同)"""
+        extra = +self._extra
+        if not extra: return list(self._hand)
+        return self._hand + [extra[name] for name in sorted(extra)]
+
+    def ting_list(self, waits=None):
+        """目前聽的牌；手牌未變動時直接用快取
+
+        waits 為「計數向量 -> 聽牌編號」的函式 (如跨 session 共用的 HandMemo.waits)，
+        手牌變動後用它重算；未給則直接呼叫 tile_engine.ting_tiles。
+        """
+        if self.logic_count != 16: return []
+        if self._waits is None:
+            counts = self.hand_counts()
+            self._waits = waits(counts) if waits else tile_engine.ting_tiles(counts, [0] * NUM_TILES)
+        return [TILE_NAMES[i] for i in self._waits if self._used[i] < 4]
+
+    # --- 異動 ---
+    def add_hand_tile(self, tile):
+        self.hand_tiles.append(tile)
+        self._track((tile,), 1, True)
+        self.logic_count += 1
+
+    def add_exposed(self, kind, tiles):
+        """加入吃/碰/槓 (槓視覺 4 張但邏輯佔 3 張)"""
+        self.exposed_tiles.append({"type": kind, "tiles": list(tiles)})
+        self._track(tiles, 1, False)
+        self.logic_count += 3
+
+    def remove_exposed(self, idx):
+        item = self.exposed_tiles.pop(idx)
+        self._track(item['tiles'], -1, False)
+        self.logic_count -= 3
+
+    def set_winning_tile(self, tile):
+        if self.winning_tile:
+            self._track((self.winning_tile,), -1, False)
+            self.logic_count -= 1
+        self.winning_tile = tile
+        if tile:
+            self._track((tile,), 1, False)
+            self.logic_count += 1
+
+    def add_flower(self, tile):
+        """加入花牌，重複則忽略；回傳是否有加入"""
+        if tile in self.flower_tiles: return False
+        self.flower_tiles.append(tile)
+        return True
+
+    def remove_last_item(self):
+        """退回：依序移除胡牌、最後一張手牌、最後一組明牌"""
+        if self.winning_tile:
+            self.set_winning_tile(None)
+        elif self.hand_tiles:
+            tile = self.hand_tiles.pop()
+            self._track((tile,), -1, True)
+            self.logic_count -= 1
+        elif self.exposed_tiles:
+            self.remove_exposed(len(self.exposed_tiles) - 1)
+
+    def load_hand(self, tiles, winning_tile=None):
+        """清空後一次填入手牌 (AI 辨識結果用)"""
+        self.load(tiles, winning_tile=winning_tile)
+
+    def load(self, hand_tiles, exposed_tiles=(), winning_tile=None, flower_tiles=()):
+        """清空後一次填入手牌、明牌、胡牌與花牌 (AI 版面解析用)"""
+        self.reset()
+        for item in exposed_tiles: self.add_exposed(item['type'], item['tiles'])
+        for tile in hand_tiles: self.add_hand_tile(tile)
+        self.set_winning_tile(winning_tile)
+        for tile in flower_tiles: self.add_flower(tile)
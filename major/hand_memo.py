@@ -0,0 +1,69 @@
+"""跨 session 共用的聽牌 / 台數結果快取 (不依賴 Streamlit)
+
+同桌多人或重複點擊會送出一樣的牌局，key 取牌局的標準編碼，與牌的輸入順序無關：
+  - 聽牌：只看暗牌計數向量，存未過濾的聽牌編號；全場已用 4 張的牌在讀取時才濾掉，
+    明牌或胡牌變動不會讓快取落空
+  - 台數：手牌計數 (34 格 bytes + 34 種以外的名稱)、明牌 (種類 + 排序後的牌，組間排序)、
+    胡牌、花牌 (排序)、以及會影響結果的設定欄位
+LRU 上限固定，server 上 session 再多記憶體也不會增加。
+"""
+import perf
+import scoring
+import tile_engine
+from lru import LRUCache
+from tile_engine import NUM_TILES, TILE_ID
+
+
+def _hand_part(state):
+    # GameState 已維護計數向量，直接拿來用；其他牌局物件才重數
+    tiles = state.hand_tiles
+    counts = state.hand_counts() if hasattr(state, 'hand_counts') else tile_engine.to_counts(tiles)
+    extra = tuple(sorted(t for t in tiles if t not in TILE_ID)) if len(counts) > NUM_TILES else ()
+    return bytes(counts[:NUM_TILES]), extra
+
+
+def _exposed_part(exposed):
+    return tuple(sorted((item['type'], tuple(sorted(item['tiles']))) for item in exposed))
+
+
+def waits_key(counts):
+    # 34 種以外的牌只能成刻/成對，名稱不影響結果，張數即可
+    return 'waits', bytes(counts)
+
+
+def tai_key(state):
+    settings = {**scoring.DEFAULT_SETTINGS, **state.settings}
+    dealer = bool(settings['is_dealer'])
+    return ('tai', _hand_part(state), _exposed_part(state.exposed_tiles), state.winning_tile,
+            tuple(sorted(state.flower_tiles)), bool(settings['is_self_draw']), dealer,
+            settings.get('streak', 0) if dealer else 0, settings['wind_round'], settings['wind_seat'])
+
+
+class HandMemo(LRUCache):
+    """聽牌 / 台數結果的 LRU 快取 (執行緒安全)"""
+
+    def __init__(self, max_entries=4096):
+        super().__init__(max_entries)
+
+    # --- 包裝 scoring；存 tuple，回傳新的 list，呼叫端改了也不會污染快取 ---
+    @perf.timed("memo.waits")
+    def waits(self, counts):
+        """暗牌計數向量 -> 聽牌編號 tuple (不看全場張數)；可直接傳給 GameState.ting_list"""
+        return self.get_or_compute(waits_key(counts), lambda: tuple(tile_engine.ting_tiles(counts, [0] * NUM_TILES)))
+
+    def ting_list(self, state):
+        """同 scoring.get_ting_list；GameState 走自己的增量快取，落空才查這裡"""
+        if hasattr(state, 'used_vector'): return state.ting_list(self.waits)
+        if scoring.get_logic_count(state) != 16: return []
+        used = tile_engine.usage_counts(state.hand_tiles, state.exposed_tiles, state.winning_tile)
+        return [tile_engine.TILE_NAMES[i] for i in self.waits(tile_engine.to_counts(state.hand_tiles)) if used[i] < 4]
+
+    @perf.timed("memo.calculate_tai")
+    def calculate_tai(self, state):
+        tai, details = self.get_or_compute(tai_key(state), lambda: _frozen_tai(state))
+        return tai, list(details)
+
+
+def _frozen_tai(state):
+    tai, details = scoring.calculate_tai(state)
+    return tai, tuple(details)
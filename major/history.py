@@ -0,0 +1,309 @@
+"""算過台數的牌局紀錄：固定長度二進位、只追加，統計以 memmap 逐欄掃描 (不依賴 Streamlit)
+
+檔案格式：16 bytes 檔頭 (MAGIC、版本、每筆長度) 後接 RECORD 陣列，每筆 64 bytes：
+    ts          寫入時間 (unix 秒)
+    hand        暗牌 (手牌 + 胡牌) 的 34 格計數
+    meld_kind   明牌 5 組的種類 (0 無、1 吃、2 碰、3 槓)
+    meld_tile   明牌各組的第一張 (吃取最小的那張)
+    winning     胡牌編號 (NO_TILE 為未記錄)
+    flowers     花牌位元遮罩 (同 tile_engine.flower_mask)
+    flags       FLAG_SELF_DRAW | FLAG_DEALER
+    streak / wind_round / wind_seat
+    tai         總台數
+    patterns    有計到的台型位元遮罩 (位元順序同 PATTERNS)
+    waits       胡牌前聽幾種牌 (聽牌寬度)
+寫入以 O_APPEND 追加，通常一次 os.write 就寫完，多個 session / process 同時追加也不會交錯；
+只寫了一部分時接著寫完，寫入失敗則截回最後一筆完整紀錄。當機留下的殘餘 bytes 在下次開檔時截掉。
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+import tile_engine
+from tile_engine import NUM_TILES, TILE_ID
+
+MAGIC = b"MJHIST\0\0"
+VERSION = 1
+_HEADER = struct.Struct("<8sII")
+HEADER_SIZE = _HEADER.size
+
+RECORD = np.dtype([
+    ('ts', '<u4'),
+    ('hand', 'u1', (NUM_TILES,)),
+    ('meld_kind', 'u1', (5,)),
+    ('meld_tile', 'u1', (5,)),
+    ('winning', 'u1'),
+    ('flowers', '<u2'),
+    ('flags', 'u1'),
+    ('streak', 'u1'),
+    ('wind_round', 'u1'),
+    ('wind_seat', 'u1'),
+    ('tai', '<u2'),
+    ('patterns', '<u4'),
+    ('waits', 'u1'),
+    ('reserved', 'u1', (2,)),
+])
+assert RECORD.itemsize == 64
+
+MELD_KINDS = ("", "吃", "碰", "槓")
+WINDS = ("東", "南", "西", "北")
+NO_TILE = 255
+FLAG_SELF_DRAW, FLAG_DEALER = 1, 2
+
+# calculate_tai 明細對應的台型；新增只能加在最後 (位元位置寫在檔案裡)
+PATTERNS = (
+    "莊家", "連莊", "三暗刻", "四暗刻", "五暗刻", "字一色", "清一色", "混一色",
+    "七對子", "碰碰胡", "平胡", "中刻", "發刻", "白刻", "圈風", "門風",
+    "門清自摸", "自摸", "花牌", "屁胡",
+)
+PATTERN_BIT = {name: 1 << i for i, name in enumerate(PATTERNS)}
+
+CHUNK = 1 << 20     # 每次掃描的筆數，限制暫存陣列大小
+
+
+# ==========================================
+# 1. 編碼
+# ==========================================
+
+def pattern_of(detail):
+    """明細一行 -> 台型名稱 (不認得回傳 None)，如「連2拉2 (4台)」-> 連莊"""
+    head = detail.split(" (")[0]
+    if head.startswith("連"): return "連莊"
+    if head.startswith("一般胡牌"): return "屁胡"
+    for name in PATTERNS:
+        if head.startswith(name): return name
+    return None
+
+
+def pattern_mask(details):
+    mask = 0
+    for line in details:
+        mask |= PATTERN_BIT.get(pattern_of(line), 0)
+    return mask
+
+
+def pattern_names(mask):
+    return [name for name, bit in PATTERN_BIT.items() if mask & bit]
+
+
+def encode(state, tai, details, ts=None):
+    """一局 (scoring 的牌局物件) 與 calculate_tai 結果 -> 一筆 RECORD；有 34 種以外的牌丟 ValueError"""
+    rec = np.zeros((), dtype=RECORD)
+    hand = tile_engine.to_counts(state.hand_tiles)
+    if len(hand) > NUM_TILES: raise ValueError("手牌含有無法辨識的牌")
+    if len(state.exposed_tiles) > 5: raise ValueError("明牌超過 5 組")
+    rec['waits'] = len(tile_engine.ting_tiles(hand, [0] * NUM_TILES))
+    if state.winning_tile:
+        win = TILE_ID.get(state.winning_tile)
+        if win is None: raise ValueError("胡牌無法辨識")
+        hand[win] += 1
+        rec['winning'] = win
+    else:
+        rec['winning'] = NO_TILE
+    rec['hand'] = hand
+    for i, item in enumerate(state.exposed_tiles):
+        ids = [TILE_ID.get(t) for t in item['tiles']]
+        if None in ids or item['type'] not in MELD_KINDS: raise ValueError("明牌無法辨識")
+        rec['meld_kind'][i] = MELD_KINDS.index(item['type'])
+        rec['meld_tile'][i] = min(ids)
+    settings = state.settings
+    rec['ts'] = int(time.time() if ts is None else ts)
+    rec['flowers'] = tile_engine.flower_mask(state.flower_tiles)
+    rec['flags'] = FLAG_SELF_DRAW * bool(settings.get('is_self_draw')) + FLAG_DEALER * bool(settings.get('is_dealer'))
+    rec['streak'] = min(255, settings.get('streak', 0))
+    rec['wind_round'] = WINDS.index(settings.get('wind_round', "東"))
+    rec['wind_seat'] = WINDS.index(settings.get('wind_seat', "東"))
+    rec['tai'] = tai
+    rec['patterns'] = pattern_mask(details)
+    return rec
+
+
+def decode(rec):
+    """一筆 RECORD -> dict (欄位同 HandState.to_dict，另加 ts / tai / patterns / waits)"""
+    hand = [int(n) for n in rec['hand']]
+    winning = None
+    if rec['winning'] != NO_TILE:
+        winning = tile_engine.TILE_NAMES[rec['winning']]
+        hand[rec['winning']] -= 1
+    exposed = []
+    for kind, first in zip(rec['meld_kind'], rec['meld_tile']):
+        if not kind: continue
+        kind = MELD_KINDS[kind]
+        ids = [first, first + 1, first + 2] if kind == "吃" else [first] * (4 if kind == "槓" else 3)
+        exposed.append({'type': kind, 'tiles': [tile_engine.TILE_NAMES[i] for i in ids]})
+    flags = int(rec['flags'])
+    return {
+        'ts': int(rec['ts']), 'hand_tiles': tile_engine.from_counts(hand), 'exposed_tiles': exposed,
+        'winning_tile': winning,
+        'flower_tiles': [f for f in tile_engine.FLOWERS if rec['flowers'] & tile_engine.FLOWER_BIT[f]],
+        'settings': {
+            'is_self_draw': bool(flags & FLAG_SELF_DRAW), 'is_dealer': bool(flags & FLAG_DEALER),
+            'streak': int(rec['streak']), 'wind_round': WINDS[rec['wind_round']], 'wind_seat': WINDS[rec['wind_seat']],
+        },
+        'tai': int(rec['tai']), 'patterns': pattern_names(int(rec['patterns'])), 'waits': int(rec['waits']),
+    }
+
+
+# ==========================================
+# 2. 檔案
+# ==========================================
+
+class HistoryStore:
+    """只追加的紀錄檔；append 執行緒安全，查詢每次重新 memmap (看得到其他 process 新寫的)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            self._check_header()
+        else:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(MAGIC, VERSION, RECORD.itemsize))
+
+    def _check_header(self):
+        with open(self.path, "r+b") as f:
+            magic, version, size = _HEADER.unpack(f.read(HEADER_SIZE).ljust(HEADER_SIZE, b"\0"))
+            if magic != MAGIC or version != VERSION or size != RECORD.itemsize:
+                raise ValueError(f"{self.path} 不是 v{VERSION} 的牌局紀錄檔")
+            f.seek(0, os.SEEK_END)
+            tail = (f.tell() - HEADER_SIZE) % RECORD.itemsize
+            if tail: f.truncate(f.tell() - tail)
+
+    def __len__(self):
+        return max(0, os.path.getsize(self.path) - HEADER_SIZE) // RECORD.itemsize
+
+    def append(self, records):
+        """追加一筆 (encode 的結果) 或一個 RECORD 陣列"""
+        data = np.ascontiguousarray(records, dtype=RECORD).tobytes()
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+            try:
+                view = memoryview(data)
+                while view:
+                    n = os.write(fd, view)
+                    if not n: raise OSError("紀錄寫入 0 bytes")
+                    view = view[n:]
+            except OSError:
+                # 寫到一半 (如磁碟滿)：截掉不完整的那筆，之後的紀錄才不會錯位
+                size = os.fstat(fd).st_size
+                os.ftruncate(fd, size - (size - HEADER_SIZE) % RECORD.itemsize)
+                raise
+            finally:
+                os.close(fd)
+
+    def add(self, state, tai, details, ts=None):
+        self.append(encode(state, tai, details, ts))
+
+    def records(self):
+        """唯讀 memmap；沒有紀錄時回傳空陣列"""
+        n = len(self)
+        if not n: return np.zeros(0, dtype=RECORD)
+        return np.memmap(self.path, dtype=RECORD, mode="r", offset=HEADER_SIZE, shape=(n,))
+
+    def stats(self, since=None, until=None, self_draw=None, dealer=None, pattern=None, min_tai=None):
+        """彙整統計；條件為 None 表示不篩選，pattern 為台型名稱
+
+        回傳 {'count', 'avg_tai', 'max_tai', 'tai_hist', 'patterns', 'waits', 'self_draw_rate'}，
+        tai_hist / patterns / waits 為 {值: 次數}。
+        """
+        n_patterns = len(PATTERNS)
+        count = tai_sum = max_tai = self_draws = 0
+        tai_hist = np.zeros(0, dtype=np.int64)
+        wait_hist = np.zeros(0, dtype=np.int64)
+        pattern_hits = np.zeros(32, dtype=np.int64)
+        records = self.records()
+        for start in range(0, len(records), CHUNK):
+            chunk = records[start:start + CHUNK]
+            tai, flags = chunk['tai'], chunk['flags']
+            mask = None
+            def keep(cond):
+                nonlocal mask
+                mask = cond if mask is None else mask & cond
+            if since is not None: keep(chunk['ts'] >= since)
+            if until is not None: keep(chunk['ts'] < until)
+            if self_draw is not None: keep((flags & FLAG_SELF_DRAW).astype(bool) == self_draw)
+            if dealer is not None: keep((flags & FLAG_DEALER).astype(bool) == dealer)
+            if pattern is not None: keep((chunk['patterns'] & PATTERN_BIT[pattern]) != 0)
+            if min_tai is not None: keep(tai >= min_tai)
+            patterns, waits = chunk['patterns'], chunk['waits']
+            if mask is not None:
+                tai, flags, patterns, waits = tai[mask], flags[mask], patterns[mask], waits[mask]
+            if not len(tai): continue
+            count += len(tai)
+            tai_sum += int(tai.sum(dtype=np.int64))
+            max_tai = max(max_tai, int(tai.max()))
+            self_draws += int(np.count_nonzero(flags & FLAG_SELF_DRAW))
+            tai_hist = _add_hist(tai_hist, np.bincount(tai))
+            wait_hist = _add_hist(wait_hist, np.bincount(waits))
+            # 每筆 4 bytes 拆成 32 個位元後逐欄加總，一次掃完所有台型
+            bits = np.unpackbits(np.ascontiguousarray(patterns, dtype='<u4').view(np.uint8).reshape(-1, 4),
+                                 axis=1, bitorder="little")
+            pattern_hits += bits.sum(axis=0, dtype=np.int64)
+        return {
+            'count': count,
+            'avg_tai': tai_sum / count if count else None,
+            'max_tai': max_tai,
+            'tai_hist': {i: int(n) for i, n in enumerate(tai_hist) if n},
+            'patterns': {PATTERNS[i]: int(pattern_hits[i]) for i in range(n_patterns) if pattern_hits[i]},
+            'waits': {i: int(n) for i, n in enumerate(wait_hist) if n},
+            'self_draw_rate': self_draws / count if count else None,
+        }
+
+    def recent(self, n=10):
+        """最近 n 局 (新的在前)，decode 過的 dict"""
+        records = self.records()
+        return [decode(r) for r in records[::-1][:n]]
+
+
+def _add_hist(acc, hist):
+    if len(hist) > len(acc): acc = np.pad(acc, (0, len(hist) - len(acc)))
+    acc[:len(hist)] += hist
+    return acc
+
+
+# ==========================================
+# 3. 指令列
+# ==========================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="牌局紀錄統計 / 匯入")
+    parser.add_argument("path", help="紀錄檔")
+    parser.add_argument("--import", dest="import_path", help="匯入 JSONL 牌局 (格式同 batch_score 輸入) 並計算台數")
+    parser.add_argument("--days", type=float, help="只統計最近幾天")
+    parser.add_argument("--pattern", choices=PATTERNS, help="只統計有此台型的牌局")
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.path)
+    if args.import_path:
+        import scoring
+        batch, skipped = [], 0
+        with open(args.import_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip(): continue
+                state = scoring.HandState.from_dict(json.loads(line))
+                tai, details = scoring.calculate_tai(state)
+                try:
+                    if "❌" in details[0]: raise ValueError(details[0])
+                    batch.append(encode(state, tai, details))
+                except ValueError:
+                    skipped += 1
+        if batch: store.append(np.stack(batch))
+        print(f"匯入 {len(batch)} 局，略過 {skipped} 局", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    since = time.time() - args.days * 86400 if args.days else None
+    stats = store.stats(since=since, pattern=args.pattern)
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    print(f"{len(store)} 筆，統計 {(time.perf_counter() - t0) * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""上傳前的影像前處理 (不依賴 Streamlit)
+
+手機照片常是數 MB 的 JPEG/PNG，且方向寫在 EXIF。模型本身只看縮到輸入尺寸的圖，
+所以先轉正、縮到 max_side、重新壓成 JPEG 再上傳，回來的框再乘回原圖座標。
+"""
+import io
+import threading
+from dataclasses import dataclass
+
+from PIL import Image, ImageOps
+
+# Roboflow 物件偵測模型的輸入邊長，超過的解析度上傳了也會被伺服器縮掉
+MODEL_INPUT_SIZE = 640
+JPEG_QUALITY = 85
+
+
+@dataclass
+class PreparedImage:
+    data: bytes             # 要上傳的 JPEG
+    scale: float            # 原圖座標 = 上傳圖座標 × scale
+    size: tuple             # 上傳圖 (寬, 高)
+    original_size: tuple    # 轉正後的原圖 (寬, 高)
+    original_bytes: int
+
+
+def prepare(file_bytes, max_side=MODEL_INPUT_SIZE, quality=JPEG_QUALITY):
+    """EXIF 轉正 → 等比縮到最長邊 max_side → JPEG 重新壓縮"""
+    with Image.open(io.BytesIO(file_bytes)) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB": img = img.convert("RGB")
+        original_size = img.size
+        longest = max(original_size)
+        scale = 1.0
+        if longest > max_side:
+            scale = longest / max_side
+            img = img.resize((round(original_size[0] / scale), round(original_size[1] / scale)), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=quality, optimize=True)
+        size = img.size
+    if size != original_size: scale = original_size[0] / size[0]
+    return PreparedImage(out.getvalue(), scale, size, original_size, len(file_bytes))
+
+
+def scale_predictions(predictions, scale, dx=0, dy=0):
+    """把框由上傳圖座標換回原圖座標 (可再加上位移)，回傳新的 list"""
+    if scale == 1 and not dx and not dy: return predictions
+    scaled = []
+    for p in predictions:
+        p = dict(p)
+        p['x'] = p['x'] * scale + dx; p['y'] = p['y'] * scale + dy
+        p['width'] = p['width'] * scale; p['height'] = p['height'] * scale
+        scaled.append(p)
+    return scaled
+
+
+class UploadStats:
+    """每次上傳的原始/實際位元組與端到端時間 (執行緒安全)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.bytes_original = 0
+        self.bytes_sent = 0
+        self.seconds = 0.0
+        self.last = None
+
+    def record(self, original_bytes, sent_bytes, seconds):
+        with self._lock:
+            self.requests += 1
+            self.bytes_original += original_bytes
+            self.bytes_sent += sent_bytes
+            self.seconds += seconds
+            self.last = {'original_bytes': original_bytes, 'sent_bytes': sent_bytes, 'seconds': seconds}
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': self.requests, 'bytes_original': self.bytes_original,
+                'bytes_sent': self.bytes_sent, 'bytes_saved': self.bytes_original - self.bytes_sent,
+                'avg_seconds': self.seconds / self.requests if self.requests else None,
+                'last': self.last,
+            }
+
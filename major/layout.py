@@ -0,0 +1,110 @@
+"""依辨識框位置拆出手牌、明牌與胡牌 (不依賴 Streamlit)
+
+照片常見擺法：手牌一排，吃/碰/槓放在另一排或同排隔開，胡的那張單獨放在旁邊。
+流程皆為排序 + 一次掃描，O(n log n)：
+  1. 依 y 中心排序，與目前這排的平均 y 相差超過半張牌高就開新排
+  2. 每排依 x 排序，間距超過半張牌寬就切段
+  3. 張數最多的段為手牌；手牌排最右側單獨一張為胡牌 (沒有則找只有一張的排)
+  4. 其餘各段依序拆成槓 (4 同)、碰 (3 同)、吃 (3 連)，拆不掉的歸回手牌
+"""
+from statistics import median
+
+from tile_engine import FLOWERS, SUITS
+
+ROW_GAP = 0.6       # × 牌高
+SEGMENT_GAP = 0.5   # × 牌寬
+
+
+def _is_flower(name):
+    return name in FLOWERS or name == "花"
+
+
+def cluster_rows(boxes):
+    """依 y 分排，回傳由上而下、每排由左而右的 list"""
+    if not boxes: return []
+    unit = median(b['height'] for b in boxes)
+    rows = []
+    for b in sorted(boxes, key=lambda b: b['y']):
+        row = rows[-1] if rows else None
+        if row is None or b['y'] - row['y_sum'] / len(row['boxes']) > ROW_GAP * unit:
+            rows.append({'boxes': [b], 'y_sum': b['y']})
+        else:
+            row['boxes'].append(b); row['y_sum'] += b['y']
+    return [sorted(r['boxes'], key=lambda b: b['x']) for r in rows]
+
+
+def split_segments(row):
+    """同一排依間距切段"""
+    unit = median(b['width'] for b in row)
+    segments = [[row[0]]]
+    for prev, b in zip(row, row[1:]):
+        gap = (b['x'] - b['width'] / 2) - (prev['x'] + prev['width'] / 2)
+        if gap > SEGMENT_GAP * unit: segments.append([b])
+        else: segments[-1].append(b)
+    return segments
+
+
+def _is_sequence(names):
+    if any(n[-1] not in SUITS or len(n) != 2 for n in names): return False
+    if len({n[-1] for n in names}) != 1: return False
+    nums = sorted(int(n[0]) for n in names)
+    return nums[1] == nums[0] + 1 and nums[2] == nums[0] + 2
+
+
+def group_melds(names):
+    """由左而右拆明牌，回傳 (melds, 拆不掉的牌)"""
+    melds, leftover = [], []
+    i = 0
+    while i < len(names):
+        if len(set(names[i:i + 4])) == 1 and len(names[i:i + 4]) == 4:
+            melds.append({"type": "槓", "tiles": names[i:i + 4]}); i += 4
+        elif len(set(names[i:i + 3])) == 1 and len(names[i:i + 3]) == 3:
+            melds.append({"type": "碰", "tiles": names[i:i + 3]}); i += 3
+        elif len(names[i:i + 3]) == 3 and _is_sequence(names[i:i + 3]):
+            melds.append({"type": "吃", "tiles": sorted(names[i:i + 3])}); i += 3
+        else:
+            leftover.append(names[i]); i += 1
+    return melds, leftover
+
+
+def parse_layout(detections):
+    """detections: [{'name', 'x', 'y', 'width', 'height'}] (框中心座標)
+
+    回傳 {'hand': [...], 'exposed': [{'type', 'tiles'}], 'winning': 牌名或 None, 'flowers': [...],
+          'rightmost': 手牌中最右邊 (x 最大) 的那張牌名或 None}
+    """
+    flowers = [d['name'] for d in sorted(detections, key=lambda d: d['x']) if _is_flower(d['name'])]
+    rows = cluster_rows([d for d in detections if not _is_flower(d['name'])])
+    result = {'hand': [], 'exposed': [], 'winning': None, 'flowers': flowers, 'rightmost': None}
+    if not rows: return result
+
+    segmented = [split_segments(row) for row in rows]
+    # 手牌：張數最多的段
+    hand_row, hand_seg = max(
+        ((r, s) for r, segs in enumerate(segmented) for s in range(len(segs))),
+        key=lambda rs: len(segmented[rs[0]][rs[1]]))
+    hand_boxes = list(segmented[hand_row][hand_seg])
+
+    # 胡牌：手牌右側隔開的單張，其次是整排只有一張的排
+    winning = None
+    segs = segmented[hand_row]
+    if hand_seg + 1 < len(segs) and len(segs[-1]) == 1:
+        winning = (hand_row, len(segs) - 1)
+    else:
+        for r, segs_r in enumerate(segmented):
+            if r != hand_row and len(segs_r) == 1 and len(segs_r[0]) == 1:
+                winning = (r, 0); break
+    if winning:
+        result['winning'] = segmented[winning[0]][winning[1]][0]['name']
+
+    for r, segs_r in enumerate(segmented):
+        for s, seg in enumerate(segs_r):
+            if (r, s) in ((hand_row, hand_seg), winning): continue
+            melds, leftover = group_melds([b['name'] for b in seg])
+            result['exposed'].extend(melds)
+            # 湊不成面子的張數併回手牌；group_melds 只回傳牌名，依名稱取回對應的框
+            for name in leftover:
+                hand_boxes.append(next(b for b in seg if b['name'] == name and b not in hand_boxes))
+    result['hand'] = [b['name'] for b in hand_boxes]
+    if hand_boxes: result['rightmost'] = max(hand_boxes, key=lambda b: b['x'])['name']
+    return result
@@ -0,0 +1,72 @@
+"""執行緒安全的 LRU 快取 (不依賴 Streamlit)，辨識結果與牌局結果快取共用
+
+上限固定，超過就淘汰最久沒用到的項目；記錄命中 / 未命中 / 淘汰次數給量測面板。
+值不可為 None (None 代表未命中)。
+"""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """LRU 快取；值在鎖外計算，同一個 key 同時落空時可能各算一次"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    # --- 不計次數的存取，子類別加其他快取層時使用 ---
+    def _lookup(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None: self._items.move_to_end(key)
+            return value
+
+    def _store(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def _count(self, hit):
+        with self._lock:
+            if hit: self.hits += 1
+            else: self.misses += 1
+
+    def get(self, key):
+        value = self._lookup(key)
+        self._count(value is not None)
+        return value
+
+    def put(self, key, value):
+        self._store(key, value)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self._items), 'max_entries': self.max_entries, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions,
+                    'hit_rate': self.hits / lookups if lookups else None}
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
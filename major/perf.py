@@ -0,0 +1,121 @@
+"""效能量測：具名計時區段與 JSONL trace (不依賴 Streamlit)
+
+每次重跑 begin() 一個 Recorder 掛在目前執行緒上 (Streamlit 每個 session 的腳本在
+自己的執行緒執行)，span() / timed() 把區段記在上面，end() 後彙整並寫入 trace。
+沒有 begin() 時 span() 回傳共用的空 context、timed() 直接呼叫原函式，
+只多一次 thread-local 查詢。
+"""
+import contextlib
+import functools
+import json
+import threading
+import time
+
+_local = threading.local()
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class Recorder:
+    """一次重跑的所有區段：(名稱, 開始偏移秒, 耗時秒, 深度)"""
+
+    def __init__(self, label):
+        self.label = label
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.spans = []
+        self.depth = 0
+
+    def summary(self):
+        """依名稱彙整 (依第一次開始的時間排序)：[{'name', 'calls', 'total_ms', 'max_ms', 'depth'}]"""
+        rows, first = {}, {}
+        for name, offset, seconds, depth in self.spans:
+            first[name] = min(first.get(name, offset), offset)
+            row = rows.get(name)
+            if row is None:
+                row = rows[name] = {'name': name, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'depth': depth}
+            row['calls'] += 1
+            row['total_ms'] += seconds * 1000
+            row['max_ms'] = max(row['max_ms'], seconds * 1000)
+        return sorted(rows.values(), key=lambda r: first[r['name']])
+
+    def to_record(self, **extra):
+        """trace 的一行"""
+        return {
+            'ts': round(self.started_at, 3), 'label': self.label,
+            'total_ms': round((self.seconds or 0) * 1000, 3), **extra,
+            'spans': [{**r, 'total_ms': round(r['total_ms'], 3), 'max_ms': round(r['max_ms'], 3)}
+                      for r in self.summary()],
+        }
+
+
+class _Span:
+    __slots__ = ('recorder', 'name', 't0')
+
+    def __init__(self, recorder, name):
+        self.recorder, self.name = recorder, name
+
+    def __enter__(self):
+        self.recorder.depth += 1
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.t0
+        rec = self.recorder
+        rec.depth -= 1
+        rec.spans.append((self.name, self.t0 - rec.start, elapsed, rec.depth))
+        return False
+
+
+def active():
+    return getattr(_local, 'recorder', None)
+
+
+def begin(label):
+    rec = _local.recorder = Recorder(label)
+    return rec
+
+
+def end():
+    """結束目前的 Recorder 並回傳 (沒有則回傳 None)"""
+    rec = getattr(_local, 'recorder', None)
+    if rec is not None:
+        rec.seconds = time.perf_counter() - rec.start
+        _local.recorder = None
+    return rec
+
+
+def span(name):
+    rec = getattr(_local, 'recorder', None)
+    if rec is None: return _NULL_SPAN
+    return _Span(rec, name)
+
+
+def timed(name=None):
+    """函式裝飾器：有 Recorder 時把每次呼叫記成一個區段"""
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            rec = getattr(_local, 'recorder', None)
+            if rec is None: return fn(*args, **kwargs)
+            with _Span(rec, label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class TraceWriter:
+    """一次重跑寫一行 JSON，多個 session 共用 (執行緒安全)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
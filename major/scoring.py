@@ -0,0 +1,317 @@
+"""台數與聽牌計算 (不依賴 Streamlit)
+
+所有函式都吃一個明確的牌局物件：只要有 hand_tiles / exposed_tiles / winning_tile /
+flower_tiles / settings 這幾個屬性即可，App 端直接傳 st.session_state，
+批次計算則用 HandState。
+"""
+from dataclasses import dataclass, field
+
+import perf
+import tile_engine
+
+DEFAULT_SETTINGS = {
+    'is_self_draw': False,
+    'is_dealer': False,
+    'streak': 0,
+    'wind_round': "東",
+    'wind_seat': "東"
+}
+
+# ==========================================
+# 1. 牌局物件
+# ==========================================
+
+@dataclass
+class HandState:
+    hand_tiles: list = field(default_factory=list)
+    exposed_tiles: list = field(default_factory=list)
+    winning_tile: str = None
+    flower_tiles: list = field(default_factory=list)
+    settings: dict = field(default_factory=lambda: dict(DEFAULT_SETTINGS))
+
+    @classmethod
+    def from_dict(cls, data):
+        """由 JSON 紀錄建立 (欄位名稱同 session_state，缺的設定用預設值)"""
+        return cls(
+            hand_tiles=list(data.get('hand_tiles', [])),
+            exposed_tiles=[{'type': item['type'], 'tiles': list(item['tiles'])} for item in data.get('exposed_tiles', [])],
+            winning_tile=data.get('winning_tile'),
+            flower_tiles=list(data.get('flower_tiles', [])),
+            settings={**DEFAULT_SETTINGS, **data.get('settings', {})},
+        )
+
+    def to_dict(self):
+        return {
+            'hand_tiles': self.hand_tiles, 'exposed_tiles': self.exposed_tiles,
+            'winning_tile': self.winning_tile, 'flower_tiles': self.flower_tiles,
+            'settings': self.settings,
+        }
+
+# ==========================================
+# 2. 張數統計
+# ==========================================
+
+def get_tile_usage(state, tile):
+    """計算特定牌在全場(手、明、胡)已使用的張數"""
+    count = state.hand_tiles.count(tile)
+    for item in state.exposed_tiles:
+        count += item['tiles'].count(tile)
+    if state.winning_tile == tile:
+        count += 1
+    return count
+
+def get_logic_count(state):
+    """計算胡牌邏輯總張數 (槓牌視覺4張但邏輯佔3張)"""
+    count = len(state.hand_tiles)
+    count += len(state.exposed_tiles) * 3 
+    if state.winning_tile: count += 1
+    return count
+
+# ==========================================
+# 3. 胡牌判斷
+# ==========================================
+
+def try_remove_sets(counts):
+    return tile_engine.is_melds(tile_engine.to_counts(counts))
+
+def check_standard_hu(counts):
+    return tile_engine.is_standard_hu(tile_engine.to_counts(counts))
+
+def check_seven_pairs(counts, exposed_len):
+    return tile_engine.is_seven_pairs(tile_engine.to_counts(counts), exposed_len)
+
+def can_form_only_sequences(counts):
+    return tile_engine.is_only_sequences(tile_engine.to_counts(counts))
+
+def check_ping_hu(counts, flowers, exposed_list):
+    has_open_pong = any(item['type'] == '碰' or item['type'] == '槓' for item in exposed_list)
+    return tile_engine.is_ping_hu(tile_engine.to_counts(counts), tile_engine.flower_mask(flowers), has_open_pong)
+
+def check_hu_logic_for_ting(temp_counts):
+    # 用於聽牌檢測的簡化版胡牌判斷 (標準胡 + 14 張七對子)
+    return tile_engine.is_hu_for_ting(tile_engine.to_counts(temp_counts))
+
+def get_ting_list(state):
+    """檢測目前聽什麼牌"""
+    if get_logic_count(state) != 16: return []
+    base_counts = tile_engine.to_counts(state.hand_tiles)
+    # 該牌未達4張才可能聽
+    used = tile_engine.usage_counts(state.hand_tiles, state.exposed_tiles, state.winning_tile)
+    return [tile_engine.TILE_NAMES[i] for i in tile_engine.ting_tiles(base_counts, used)]
+
+# ==========================================
+# 4. 最高台數拆法搜尋
+# ==========================================
+# 同一手牌可能有多種拆法 (如 111222333 可拆三刻或三順)，暗刻、碰碰胡、平胡
+# 都依拆法而定，因此列舉所有拆法取最高者。
+
+PATTERN_NONE, PATTERN_PING, PATTERN_PENG = 0, 1, 2
+PATTERN_TAI = (0, 2, 4)
+
+def an_ke_tai(n):
+    if n >= 5: return 8
+    if n == 4: return 5
+    if n == 3: return 2
+    return 0
+
+def _pattern(allow_peng, allow_ping, has_chow, has_trip):
+    if allow_peng and not has_chow: return PATTERN_PENG
+    if allow_ping and not has_trip: return PATTERN_PING
+    return PATTERN_NONE
+
+def _summarize(options, win_idx, self_draw):
+    """每種拆法濃縮成 (暗刻數, 有順子, 有刻子, 拆法)，同摘要只留一個，暗刻多的排前面
+
+    放槍胡時，胡的那張若只能落在刻子上，該刻子不算暗刻；
+    若同組還有含該牌的將或順子，胡牌可視為落在那裡，刻子仍算暗刻。
+    """
+    seen = {}
+    for option in options:
+        pair, trips, chows = option
+        n = 0
+        for t in trips:
+            if self_draw or t != win_idx or pair == t or any(c <= t <= c + 2 for c in chows):
+                n += 1
+        key = (n, bool(chows), bool(trips))
+        if key not in seen: seen[key] = option
+    return sorted(((n, chow, trip, option) for (n, chow, trip), option in seen.items()),
+                  key=lambda s: -s[0])
+
+@perf.timed()
+def best_decomposition(counts, win_idx, self_draw, allow_peng, allow_ping):
+    """分支定界找暗刻 + 牌型台數最高的拆法
+
+    回傳 (台數, 暗刻數, 牌型, (將, 刻子, 順子))；不是標準胡回傳 None。
+    """
+    groups = tile_engine.group_decompositions(counts)
+    if groups is None: return None
+    summaries = [_summarize(options, win_idx, self_draw) for options in groups]
+    # suffix_max[g]：第 g 組以後最多還能拿到的暗刻數，作為上界
+    suffix_max = [0] * (len(summaries) + 1)
+    for g in range(len(summaries) - 1, -1, -1):
+        suffix_max[g] = suffix_max[g + 1] + summaries[g][0][0]
+
+    best = [-1, 0, PATTERN_NONE, ()]
+    def search(g, an_ke, has_chow, has_trip, picked):
+        cap = PATTERN_TAI[_pattern(allow_peng, allow_ping and not has_trip, has_chow, False)]
+        if an_ke_tai(an_ke + suffix_max[g]) + cap <= best[0]: return
+        if g == len(summaries):
+            pattern = _pattern(allow_peng, allow_ping, has_chow, has_trip)
+            best[:] = [an_ke_tai(an_ke) + PATTERN_TAI[pattern], an_ke, pattern, picked]
+            return
+        for n, chow, trip, option in summaries[g]:
+            search(g + 1, an_ke + n, has_chow or chow, has_trip or trip, picked + (option,))
+    search(0, 0, False, False, ())
+
+    score, an_ke, pattern, picked = best
+    pair = next(p for p, _, _ in picked if p >= 0)
+    trips = tuple(t for _, ts, _ in picked for t in ts)
+    chows = tuple(c for _, _, cs in picked for c in cs)
+    return score, an_ke, pattern, (pair, trips, chows)
+
+# ==========================================
+# 5. 台數計算
+# ==========================================
+# 胡牌判斷之後只掃一次牌，把台數需要的資訊濃縮成 HandFeatures：
+# bits 為各種條件的位元 (花色、字刻、暗刻數級距、牌型、明牌種類、設定)，
+# 另存連莊數、花牌數與風位名稱。每條規則只是對 bits 的遮罩測試，
+# 依 RULES 的順序輸出明細 (與舊版逐項判斷的順序相同)。
+
+(F_DEALER, F_STREAK, F_AN_KE_3, F_AN_KE_4, F_AN_KE_5, F_ALL_HONORS, F_PURE, F_HALF,
+ F_SEVEN_PAIRS, F_PENG, F_PING, F_RED, F_GREEN, F_WHITE, F_ROUND_WIND, F_SEAT_WIND,
+ F_SELF_DRAW, F_CONCEALED, F_FLOWERS) = (1 << i for i in range(19))
+
+# 花色出現位元 (萬、筒、條、字) -> 字一色 / 清一色 / 混一色
+_SUIT_MAN, _SUIT_PIN, _SUIT_SOU, _SUIT_HONOR = 1, 2, 4, 8
+_SUIT_BITS = (_SUIT_MAN,) * 9 + (_SUIT_PIN,) * 9 + (_SUIT_SOU,) * 9 + (_SUIT_HONOR,) * 7
+SUIT_CLASS = tuple(
+    F_ALL_HONORS if s == _SUIT_HONOR else
+    F_PURE if s in (_SUIT_MAN, _SUIT_PIN, _SUIT_SOU) else
+    F_HALF if s & _SUIT_HONOR and (s & 7) in (_SUIT_MAN, _SUIT_PIN, _SUIT_SOU) else 0
+    for s in range(16))
+AN_KE_CLASS = (0, 0, 0, F_AN_KE_3, F_AN_KE_4, F_AN_KE_5)
+PATTERN_CLASS = {PATTERN_NONE: 0, PATTERN_PING: F_PING, PATTERN_PENG: F_PENG, None: F_SEVEN_PAIRS}
+DRAGON_BITS = ((tile_engine.TILE_ID["中"], F_RED), (tile_engine.TILE_ID["發"], F_GREEN),
+               (tile_engine.TILE_ID["白"], F_WHITE))
+
+# (明細格式, 需要的位元, 不可有的位元, 台數, 台數乘上的欄位)
+RULES = (
+    ("莊家 (1台)", F_DEALER, 0, 1, None),
+    ("連{streak}拉{streak} ({tai}台)", F_DEALER | F_STREAK, 0, 2, 'streak'),
+    ("三暗刻 (2台)", F_AN_KE_3, 0, 2, None),
+    ("四暗刻 (5台)", F_AN_KE_4, 0, 5, None),
+    ("五暗刻 (8台)", F_AN_KE_5, 0, 8, None),
+    ("字一色 (16台)", F_ALL_HONORS, 0, 16, None),
+    ("清一色 (8台)", F_PURE, 0, 8, None),
+    ("混一色 (4台)", F_HALF, 0, 4, None),
+    ("七對子 (8台)", F_SEVEN_PAIRS, 0, 8, None),
+    ("碰碰胡 (4台)", F_PENG, 0, 4, None),
+    ("平胡 (2台)", F_PING, 0, 2, None),
+    ("中刻 (1台)", F_RED, 0, 1, None),
+    ("發刻 (1台)", F_GREEN, 0, 1, None),
+    ("白刻 (1台)", F_WHITE, 0, 1, None),
+    ("圈風{wind_round} (1台)", F_ROUND_WIND, 0, 1, None),
+    ("門風{wind_seat} (1台)", F_SEAT_WIND, 0, 1, None),
+    ("門清自摸 (3台)", F_SELF_DRAW | F_CONCEALED, 0, 3, None),
+    ("自摸 (1台)", F_SELF_DRAW, F_CONCEALED, 1, None),
+    ("花牌x{flowers} ({tai}台)", F_FLOWERS, 0, 1, 'flowers'),
+)
+NO_TAI_DETAIL = "一般胡牌 (屁胡)"
+
+
+@dataclass(frozen=True)
+class HandFeatures:
+    bits: int
+    streak: int = 0
+    flowers: int = 0
+    wind_round: str = "東"
+    wind_seat: str = "東"
+
+
+@perf.timed()
+def hand_features(state):
+    """胡牌判斷 + 一次掃描建立 HandFeatures；尚未胡牌回傳 None"""
+    hand = state.hand_tiles
+    win_tile = state.winning_tile
+    exposed = state.exposed_tiles
+    flowers = state.flower_tiles
+    settings = {**DEFAULT_SETTINGS, **state.settings}
+
+    counts = tile_engine.to_counts(hand + [win_tile] if win_tile else hand)
+    win_idx = tile_engine.TILE_ID.get(win_tile, -1)
+    if win_idx < 0 and win_tile:
+        extra = sorted({t for t in hand if t not in tile_engine.TILE_ID} | {win_tile})
+        win_idx = tile_engine.NUM_TILES + extra.index(win_tile)
+
+    # 明牌種類與全牌池 (手 + 明) 的張數、花色
+    kinds = {item['type'] for item in exposed}
+    pool = counts[:tile_engine.NUM_TILES]
+    suits = _SUIT_HONOR if len(counts) > tile_engine.NUM_TILES else 0     # 34 種以外的名稱算字
+    for item in exposed:
+        for t in item['tiles']:
+            idx = tile_engine.TILE_ID.get(t)
+            if idx is None: suits |= _SUIT_HONOR
+            else: pool[idx] += 1
+    for idx, n in enumerate(pool):
+        if n: suits |= _SUIT_BITS[idx]
+
+    allow_peng = kinds <= {'碰', '槓'}
+    allow_ping = not flowers and not kinds & {'碰', '槓'}
+    is_seven = tile_engine.is_seven_pairs(counts, len(exposed))
+    best = best_decomposition(counts, win_idx, settings['is_self_draw'], allow_peng, allow_ping)
+    if not (is_seven or best): return None
+
+    # 七對子 (8台、無暗刻) 與標準胡最佳拆法取高者
+    if best and (not is_seven or best[0] > 8):
+        _, num_an_ke, pattern, _ = best
+    else:
+        num_an_ke, pattern = 0, None
+
+    bits = SUIT_CLASS[suits] | AN_KE_CLASS[min(num_an_ke, 5)] | PATTERN_CLASS[pattern]
+    for idx, bit in DRAGON_BITS:
+        if pool[idx] >= 3: bits |= bit
+    round_idx = tile_engine.TILE_ID.get(settings['wind_round'])
+    seat_idx = tile_engine.TILE_ID.get(settings['wind_seat'])
+    if round_idx is not None and pool[round_idx] >= 3: bits |= F_ROUND_WIND
+    if seat_idx is not None and pool[seat_idx] >= 3: bits |= F_SEAT_WIND
+    streak = 0
+    if settings.get('is_dealer', False):
+        bits |= F_DEALER
+        streak = settings.get('streak', 0)
+        if streak > 0: bits |= F_STREAK
+    if settings['is_self_draw']: bits |= F_SELF_DRAW
+    if not kinds & {'吃', '碰', '槓'}: bits |= F_CONCEALED
+    if flowers: bits |= F_FLOWERS
+    return HandFeatures(bits, streak, len(flowers), settings['wind_round'], settings['wind_seat'])
+
+
+def rule_tai(features):
+    """只算總台數 (不產生明細)，批次計分用；features 為 None 時回傳 0"""
+    if features is None: return 0
+    bits, total = features.bits, 0
+    for _, need, deny, tai, per in RULES:
+        if bits & need == need and not bits & deny:
+            total += tai * getattr(features, per) if per else tai
+    return total
+
+
+@perf.timed()
+def apply_rules(features):
+    """依 RULES 順序計台，回傳 (總台數, 明細)"""
+    bits, total, details = features.bits, 0, []
+    for fmt, need, deny, tai, per in RULES:
+        if bits & need == need and not bits & deny:
+            if per: tai *= getattr(features, per)
+            total += tai
+            details.append(fmt.format(tai=tai, streak=features.streak, flowers=features.flowers,
+                                      wind_round=features.wind_round, wind_seat=features.wind_seat)
+                           if "{" in fmt else fmt)
+    if total == 0: details.append(NO_TAI_DETAIL)
+    return total, details
+
+
+def calculate_tai(state):
+    """計算台數，回傳 (總台數, 明細)；多種拆法時取台數最高者"""
+    features = hand_features(state)
+    if features is None: return 0, ["❌ 尚未胡牌"]
+    return apply_rules(features)
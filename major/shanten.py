@@ -0,0 +1,142 @@
+"""向聽數計算與出牌建議 (不依賴 Streamlit)
+
+向聽數 = 離聽牌還差幾手，-1 代表已胡、0 代表聽牌。
+一般型以「面子 / 搭子 / 將」拆塊估算：
+    向聽 = 2 × (需要面子數 - 面子) - 搭子 - 將   (面子 + 搭子不超過需要面子數)
+各門以張數 tuple 記憶化，只拆一次；整手再把各組的可行組合合併。
+"""
+from functools import lru_cache
+
+import tile_engine
+from tile_engine import HONOR_START, NUM_TILES, TILE_NAMES
+
+
+def _pareto(blocks):
+    # 去掉被支配的 (面子, 搭子, 將) 組合：三項都不比別人多者丟棄
+    blocks = sorted(set(blocks), reverse=True)
+    kept = []
+    for b in blocks:
+        if not any(k[0] >= b[0] and k[1] >= b[1] and k[2] >= b[2] for k in kept):
+            kept.append(b)
+    return tuple(kept)
+
+
+@lru_cache(maxsize=65536)
+def _suit_blocks(digits):
+    """一門 (9 格) 所有拆塊結果 (面子, 搭子, 將)，已去除被支配者"""
+    i = next((k for k, n in enumerate(digits) if n), None)
+    if i is None: return ((0, 0, 0),)
+    d = list(digits)
+    out = []
+
+    def take(idxs, dm, dt, dp):
+        for k in idxs: d[k] -= 1
+        for m, t, p in _suit_blocks(tuple(d)):
+            if p + dp <= 1: out.append((m + dm, t + dt, p + dp))
+        for k in idxs: d[k] += 1
+
+    take((i,), 0, 0, 0)                                   # 孤張
+    if d[i] >= 3: take((i, i, i), 1, 0, 0)                # 刻子
+    if d[i] >= 2:
+        take((i, i), 0, 1, 0)                             # 對子當搭子
+        take((i, i), 0, 0, 1)                             # 對子當將
+    if i + 1 < len(d) and d[i + 1]:
+        if i + 2 < len(d) and d[i + 2]: take((i, i + 1, i + 2), 1, 0, 0)   # 順子
+        take((i, i + 1), 0, 1, 0)                         # 兩面/邊張
+    if i + 2 < len(d) and d[i + 2]: take((i, i + 2), 0, 1, 0)              # 嵌張
+    return _pareto(out)
+
+
+def _honor_blocks(n):
+    # 字牌只能成刻、對子 (搭子或將)
+    if n >= 3: return ((1, 0, 0), (0, 1, 1)) if n == 4 else ((1, 0, 0), (0, 0, 1))
+    if n == 2: return ((0, 1, 0), (0, 0, 1))
+    return ((0, 0, 0),)
+
+
+def standard_shanten(counts, sets_needed=None):
+    """一般型向聽數；sets_needed 預設為 張數 // 3"""
+    total = sum(counts)
+    if sets_needed is None: sets_needed = total // 3
+    combos = ((0, 0, 0),)
+    groups = [_suit_blocks(tuple(counts[b:b + 9])) for b in (0, 9, 18)]
+    groups.extend(_honor_blocks(counts[i]) for i in range(HONOR_START, len(counts)) if counts[i] >= 2)
+    for blocks in groups:
+        combos = _pareto((m1 + m2, t1 + t2, p1 + p2)
+                         for m1, t1, p1 in combos for m2, t2, p2 in blocks if p1 + p2 <= 1)
+    best = 2 * sets_needed
+    for m, t, p in combos:
+        m = min(m, sets_needed)
+        best = min(best, 2 * (sets_needed - m) - min(t, sets_needed - m) - p)
+    return best
+
+
+def seven_pairs_shanten(counts):
+    """七對子 (17 張 8 對，4 張同牌算 2 對) 向聽數，張數不是 16/17 張時回傳 None"""
+    total = sum(counts)
+    if total not in (16, 17): return None
+    if total == 17 and tile_engine.is_seven_pairs(counts, 0): return -1
+    # 三張只當一對用，多出的一張得先換掉：16 張時第一組三張可等第 4 張 (聽牌)，
+    # 之後每組多一步；17 張可先打掉其中一組的第 3 張
+    pairs = sum(n // 2 for n in counts)
+    threes = sum(1 for n in counts if n == 3)
+    return 7 - min(pairs, 7) + max(0, threes - (total - 15))
+
+
+def _ready(counts, allow_seven):
+    # 拆塊不看張數上限：單吊手上已有 4 張的牌也會算成聽牌，實際查一次聽牌表確認
+    c = list(counts)
+    for idx in tile_engine.ting_tiles(counts, [0] * NUM_TILES):
+        if allow_seven: return True
+        c[idx] += 1
+        hu = tile_engine.is_standard_hu(c)
+        c[idx] -= 1
+        if hu: return True
+    return False
+
+
+def shanten(counts, sets_needed=None, allow_seven=True):
+    """向聽數：一般型與七對子 (無明牌時) 取小者"""
+    s = standard_shanten(counts, sets_needed)
+    if s == 0 and sum(counts) % 3 == 1 and not _ready(counts, allow_seven): s = 1
+    if allow_seven:
+        s7 = seven_pairs_shanten(counts)
+        if s7 is not None: s = min(s, s7)
+    return s
+
+
+def useful_tiles(counts, used, sets_needed=None, allow_seven=True, base=None):
+    """摸進後能降低向聽的牌：回傳 ([(牌編號, 剩餘張數)], 剩餘總張數)"""
+    if base is None: base = shanten(counts, sets_needed, allow_seven)
+    c = list(counts)
+    tiles = []
+    for idx in range(NUM_TILES):
+        left = 4 - used[idx]
+        if left <= 0: continue
+        c[idx] += 1
+        if shanten(c, sets_needed, allow_seven) < base: tiles.append((idx, left))
+        c[idx] -= 1
+    return tiles, sum(left for _, left in tiles)
+
+
+def advise_discards(counts, used, sets_needed=None, allow_seven=True):
+    """出牌建議：對手上每種牌試打一張，回傳依 (向聽, -進張數) 排序的
+    [{'discard': 牌名, 'shanten': n, 'useful': [牌名...], 'live': 進張總數}]
+
+    used 為全場已見張數 (含自己手牌)，剩餘張數 = 4 - used。
+    """
+    if sets_needed is None: sets_needed = (sum(counts) - 1) // 3
+    c = list(counts)
+    advice = []
+    for idx in range(NUM_TILES):
+        if not c[idx]: continue
+        c[idx] -= 1
+        s = shanten(c, sets_needed, allow_seven)
+        tiles, live = useful_tiles(c, used, sets_needed, allow_seven, base=s)
+        c[idx] += 1
+        advice.append({
+            'discard': TILE_NAMES[idx], 'shanten': s,
+            'useful': [TILE_NAMES[t] for t, _ in tiles], 'live': live,
+        })
+    advice.sort(key=lambda a: (a['shanten'], -a['live']))
+    return advice
@@ -0,0 +1,221 @@
+"""蒙地卡羅估算：k 巡內自摸胡牌的機率與胡牌時的期望台數 (不依賴 Streamlit)
+
+牌牆模型：自己看不到的牌 (每種 4 - 全場已使用張數) 都可能被摸到，每次模擬
+從中不放回抽 k 張。出牌策略 (貪婪)：
+  - 摸到不能降低向聽的牌就直接打掉
+  - 摸到有效牌就改打能維持最低向聽的牌，同分時打最孤立的 (與手上其他牌關聯最少)
+  - 聽牌時摸到胡牌即自摸，以 scoring.calculate_tai (自摸) 計台
+只模擬自己摸牌，不含放槍/搶胡；一手牌在同一個 process 內重複出現時向聽與台數都走快取。
+
+批次可分給 process pool 並行，每批結束就更新信賴區間，收斂或超過時間預算即停止。
+"""
+import math
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import replace
+from functools import lru_cache
+
+import scoring
+import shanten
+import tile_engine
+from tile_engine import NUM_TILES, TILE_NAMES
+
+Z95 = 1.96
+
+
+# ==========================================
+# 1. 單次模擬 (worker 端)
+# ==========================================
+
+def _neighbors(c, idx):
+    """idx 附近 (同門 ±2，字牌只有自己) 手上的張數"""
+    if idx >= tile_engine.HONOR_START: return c[idx]
+    lo = idx - idx % 9
+    return sum(c[j] for j in range(max(lo, idx - 2), min(lo + 8, idx + 2) + 1))
+
+
+@lru_cache(maxsize=65536)
+def _useful(counts, sets_needed, allow_seven):
+    """(向聽, 有效牌編號 frozenset)
+
+    與手上任何牌都不相鄰的牌摸進來形不成搭子或對子，向聽不會下降，只試相鄰的牌。
+    """
+    s = shanten.shanten(counts, sets_needed, allow_seven)
+    c = list(counts)
+    candidates = set()
+    for idx in range(NUM_TILES):
+        if not c[idx]: continue
+        if idx >= tile_engine.HONOR_START: candidates.add(idx); continue
+        lo = idx - idx % 9
+        candidates.update(range(max(lo, idx - 2), min(lo + 8, idx + 2) + 1))
+    tiles = []
+    for idx in sorted(candidates):
+        if c[idx] >= 4: continue
+        c[idx] += 1
+        if shanten.shanten(c, sets_needed, allow_seven) < s: tiles.append(idx)
+        c[idx] -= 1
+    return s, frozenset(tiles)
+
+
+@lru_cache(maxsize=65536)
+def _best_discard(counts, sets_needed, allow_seven):
+    """摸進有效牌後 (多一張) 該打哪張：維持最低向聽，其次打最孤立的牌"""
+    c = list(counts)
+    best = None
+    for idx in range(NUM_TILES):
+        if not c[idx]: continue
+        c[idx] -= 1
+        key = (shanten.shanten(c, sets_needed, allow_seven), _neighbors(c, idx), idx)
+        c[idx] += 1
+        if best is None or key < best: best = key
+    return best[2]
+
+
+def simulate_batch(job):
+    """跑 job['trials'] 次，回傳各項加總 (可直接相加合併)"""
+    hand, draws, seed = job['hand'], job['draws'], job['seed']
+    sets_needed, allow_seven = job['sets_needed'], job['allow_seven']
+    state = job['state']
+    deadline = job.get('deadline')
+    rng = random.Random(seed)
+    wins = trials = 0
+    tai_sum = tai_sq = 0.0
+    by_draw = [0] * draws
+    tai_cache = {}
+    for _ in range(job['trials']):
+        if deadline is not None and trials and time.time() >= deadline: break
+        trials += 1
+        c = list(hand)
+        s, useful = _useful(hand, sets_needed, allow_seven)
+        for turn, d in enumerate(rng.sample(job['wall'], draws)):
+            if d not in useful: continue
+            if s == 0:
+                key = (tuple(c), d)
+                tai = tai_cache.get(key)
+                if tai is None:
+                    win_state = replace(state, hand_tiles=tile_engine.from_counts(c), winning_tile=TILE_NAMES[d])
+                    tai = tai_cache[key] = scoring.calculate_tai(win_state)[0]
+                wins += 1; tai_sum += tai; tai_sq += tai * tai; by_draw[turn] += 1
+                break
+            c[d] += 1
+            c[_best_discard(tuple(c), sets_needed, allow_seven)] -= 1
+            s, useful = _useful(tuple(c), sets_needed, allow_seven)
+    return {'trials': trials, 'wins': wins, 'tai_sum': tai_sum, 'tai_sq': tai_sq, 'by_draw': by_draw}
+
+
+# ==========================================
+# 2. 統計
+# ==========================================
+
+def wilson_interval(wins, n, z=Z95):
+    if n == 0: return 0.0, 1.0
+    p = wins / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def _summary(totals, draws, elapsed, converged):
+    n, wins = totals['trials'], totals['wins']
+    p = wins / n if n else 0.0
+    mean = var = None
+    tai_ci = None
+    if wins:
+        mean = totals['tai_sum'] / wins
+        var = max(0.0, totals['tai_sq'] / wins - mean * mean) * wins / max(1, wins - 1)
+        half = Z95 * math.sqrt(var / wins)
+        tai_ci = (mean - half, mean + half)
+    cumulative, acc = [], 0
+    for w in totals['by_draw']:
+        acc += w; cumulative.append(acc / n if n else 0.0)
+    return {
+        'trials': n, 'draws': draws, 'win_prob': p, 'win_ci': wilson_interval(wins, n),
+        'expected_tai': mean, 'tai_ci': tai_ci,
+        'expected_tai_overall': p * mean if mean is not None else 0.0,
+        'by_draw': cumulative, 'converged': converged, 'seconds': elapsed,
+    }
+
+
+def _converged(totals, tol, tai_tol):
+    n, wins = totals['trials'], totals['wins']
+    lo, hi = wilson_interval(wins, n)
+    if (hi - lo) / 2 > tol: return False
+    if wins < 30: return True       # 胡牌次數太少，期望台數的區間沒有意義，只看機率
+    mean = totals['tai_sum'] / wins
+    var = max(0.0, totals['tai_sq'] / wins - mean * mean)
+    return Z95 * math.sqrt(var / wins) <= tai_tol
+
+
+# ==========================================
+# 3. 對外介面
+# ==========================================
+
+def build_job(state, draws):
+    """由牌局 (16 張、尚未胡) 建立模擬參數；牌局不合法時丟 ValueError"""
+    if state.winning_tile: raise ValueError("已經胡牌，無需估算")
+    if scoring.get_logic_count(state) != 16: raise ValueError("需要 16 張 (摸牌前) 才能估算")
+    hand = tile_engine.to_counts(state.hand_tiles)
+    if len(hand) > NUM_TILES: raise ValueError("手牌含有無法辨識的牌")
+    used = tile_engine.usage_counts(state.hand_tiles, state.exposed_tiles, state.winning_tile)
+    wall = [i for i in range(NUM_TILES) for _ in range(max(0, 4 - used[i]))]
+    if len(wall) < draws: raise ValueError("剩餘牌數不足")
+    settings = {**scoring.DEFAULT_SETTINGS, **state.settings, 'is_self_draw': True}
+    return {
+        'hand': tuple(hand), 'wall': wall, 'draws': draws,
+        'sets_needed': 5 - len(state.exposed_tiles), 'allow_seven': not state.exposed_tiles,
+        'state': scoring.HandState(hand_tiles=[], exposed_tiles=[dict(e) for e in state.exposed_tiles],
+                                   flower_tiles=list(state.flower_tiles), settings=settings),
+    }
+
+
+def estimate(state, draws=10, executor=None, in_flight=4, batch_size=200, min_trials=1000,
+             max_trials=50000, tol=0.01, tai_tol=0.25, time_budget=None, seed=None):
+    """估算 draws 巡內自摸的機率與期望台數
+
+    executor 為 concurrent.futures 的 pool (None 則在目前 process 執行)，同時送出 in_flight 批。
+    至少跑 min_trials 次；之後胡牌機率的 95% 信賴區間半寬 <= tol 且期望台數半寬 <= tai_tol
+    即停止，或達 max_trials / time_budget 秒。
+    回傳 {'trials', 'win_prob', 'win_ci', 'expected_tai', 'tai_ci', 'expected_tai_overall',
+          'by_draw' (第 i 巡前累積胡牌機率), 'converged', 'seconds'}
+    """
+    job = build_job(state, draws)
+    base_seed = random.randrange(2 ** 32) if seed is None else seed
+    totals = {'trials': 0, 'wins': 0, 'tai_sum': 0.0, 'tai_sq': 0.0, 'by_draw': [0] * draws}
+    start = time.perf_counter()
+    batch_no = 0
+    converged = False
+
+    # worker 跨 process，截止時間用 time.time()；每批至少跑一次
+    deadline = time.time() + time_budget if time_budget is not None else None
+
+    def next_job():
+        nonlocal batch_no
+        batch_no += 1
+        return {**job, 'trials': batch_size, 'seed': base_seed + batch_no, 'deadline': deadline}
+
+    def merge(result):
+        for key in ('trials', 'wins', 'tai_sum', 'tai_sq'): totals[key] += result[key]
+        totals['by_draw'] = [a + b for a, b in zip(totals['by_draw'], result['by_draw'])]
+
+    def should_stop():
+        nonlocal converged
+        if totals['trials'] >= min_trials and _converged(totals, tol, tai_tol):
+            converged = True
+            return True
+        if totals['trials'] >= max_trials: return True
+        return time_budget is not None and time.perf_counter() - start >= time_budget
+
+    if executor is None:
+        while not should_stop(): merge(simulate_batch(next_job()))
+    else:
+        pending = {executor.submit(simulate_batch, next_job()) for _ in range(in_flight)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done: merge(f.result())
+            if should_stop():
+                for f in pending: f.cancel()
+                break
+            pending |= {executor.submit(simulate_batch, next_job()) for _ in done}
+    return _summary(totals, draws, time.perf_counter() - start, converged)
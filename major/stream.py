@@ -0,0 +1,159 @@
+"""連續辨識：影片檔或串流逐格讀取，畫面沒變就不送辨識 (不依賴 Streamlit)
+
+  - FrameGate：每格縮成 16x16 灰階，與上一張「有送出」的格平均差異小於門檻就略過
+  - HandStabilizer：最近 window 格中同一組牌出現 min_agree 次才算穩定，避免手晃時跳動
+  - StreamStats：處理/略過/送出格數與 fps
+讀影片需要 opencv (選用)。
+"""
+import io
+import os
+import tempfile
+import time
+from collections import Counter, deque
+
+import numpy as np
+from PIL import Image
+
+try:
+    import cv2
+except ImportError:     # 選用：只有連續辨識需要
+    cv2 = None
+
+GATE_SIZE = 16
+GATE_THRESHOLD = 6.0    # 灰階 0~255 的平均絕對差
+
+
+def frame_signature(image, size=GATE_SIZE):
+    """縮小灰階後的像素陣列 (float32)，比對成本與原圖大小無關"""
+    return np.asarray(image.convert("L").resize((size, size), Image.BILINEAR), dtype=np.float32)
+
+
+class FrameGate:
+    """判斷這一格是否與上次送出的格有明顯差異"""
+
+    def __init__(self, threshold=GATE_THRESHOLD, size=GATE_SIZE):
+        self.threshold = threshold
+        self.size = size
+        self._last = None
+
+    def changed(self, image):
+        sig = frame_signature(image, self.size)
+        if self._last is not None and float(np.abs(sig - self._last).mean()) < self.threshold:
+            return False
+        self._last = sig
+        return True
+
+
+class HandStabilizer:
+    """多格投票：回傳穩定的辨識結果，未穩定時回傳 None"""
+
+    def __init__(self, window=5, min_agree=3):
+        self.min_agree = min_agree
+        self._recent = deque(maxlen=window)
+        self._latest = {}       # 牌名組合 → 該組合最近一次的完整結果
+
+    def push(self, detections):
+        key = tuple(d['name'] for d in detections)
+        self._recent.append(key)
+        self._latest = {k: v for k, v in self._latest.items() if k in self._recent}
+        self._latest[key] = detections
+        key, votes = Counter(self._recent).most_common(1)[0]
+        if votes < self.min_agree or not key: return None
+        return self._latest[key]
+
+
+class StreamStats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.frames = self.skipped = self.sent = 0
+
+    def snapshot(self):
+        elapsed = time.perf_counter() - self.start
+        return {
+            'frames': self.frames, 'skipped': self.skipped, 'sent': self.sent,
+            'fps': self.frames / elapsed if elapsed else 0.0,
+            'sent_fps': self.sent / elapsed if elapsed else 0.0,
+        }
+
+
+def parse_sources(spec):
+    """伺服器設定的串流來源「名稱=網址或攝影機編號」以逗號分隔 -> {名稱: 來源}
+
+    沒寫名稱時以來源本身當名稱。使用者只能從這裡挑，不能自己輸入路徑或網址
+    (VideoCapture 在伺服器上開啟，任意輸入等於讓人讀伺服器的檔案、網路或攝影機)。
+    """
+    sources = {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item: continue
+        name, sep, source = item.partition("=")
+        if not sep or "://" in name: name, source = item, item
+        sources[name.strip()] = source.strip()
+    return sources
+
+
+def read_frames(source, max_frames=None):
+    """逐格產生 PIL 影像；source 為影片檔 bytes、檔案路徑、串流網址或攝影機編號"""
+    if cv2 is None:
+        raise RuntimeError("連續辨識需要安裝 opencv-python-headless")
+    tmp = None
+    if isinstance(source, bytes):
+        # VideoCapture 只吃路徑，上傳的影片先寫暫存檔
+        fd, tmp = tempfile.mkstemp(suffix=".mp4")
+        with os.fdopen(fd, "wb") as f: f.write(source)
+        source = tmp
+    elif isinstance(source, str) and source.isdigit():
+        source = int(source)
+    capture = cv2.VideoCapture(source)
+    try:
+        if not capture.isOpened():
+            raise RuntimeError("無法開啟影片或串流")
+        count = 0
+        while max_frames is None or count < max_frames:
+            ok, frame = capture.read()
+            if not ok: break
+            count += 1
+            yield Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    finally:
+        capture.release()
+        if tmp: os.remove(tmp)
+
+
+def encode_frame(image, max_side=640, quality=85):
+    """縮到 max_side 後壓成 JPEG，回傳 (bytes, scale)；原圖座標 = 回傳圖座標 × scale"""
+    scale = 1.0
+    if max(image.size) > max_side:
+        ratio = max(image.size) / max_side
+        width = image.width
+        image = image.resize((round(image.width / ratio), round(image.height / ratio)), Image.BILINEAR)
+        scale = width / image.width
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=quality)
+    return out.getvalue(), scale
+
+
+def run(frames, detect, gate=None, stabilizer=None, stats=None):
+    """逐格處理，每格產生 {'sent', 'detections', 'stable', 'changed', 'stats'}
+
+    detect(PIL 影像) 回傳辨識結果 (list)；只有畫面有變的格才會呼叫，
+    沒變的格沿用上一次結果投票，靜止畫面幾格後即可穩定。
+    changed 表示穩定結果與上一次不同，呼叫端可據此更新看板。
+    """
+    gate = gate or FrameGate()
+    stabilizer = stabilizer or HandStabilizer()
+    stats = stats or StreamStats()
+    stable = last = None
+    for image in frames:
+        stats.frames += 1
+        detections = None
+        if gate.changed(image):
+            stats.sent += 1
+            detections = last = detect(image)
+        else:
+            stats.skipped += 1
+        result = stabilizer.push(last) if last is not None else None
+        changed = result is not None and (stable is None or
+                                          [d['name'] for d in result] != [d['name'] for d in stable])
+        if changed: stable = result
+        yield {'sent': detections is not None, 'detections': detections, 'stable': stable,
+               'changed': changed, 'stats': stats.snapshot()}
@@ -0,0 +1,5 @@
+# 模組放在 major/ 底下以平面方式 import (同 app.py)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,55 @@
+"""效能基準的語料、計時與退步比較"""
+import random
+
+import bench_engine
+import tile_engine
+
+
+def _report(results, **meta):
+    return {'meta': {'seed': 0, 'size': 10, 'worst': 5, **meta}, 'results': results}
+
+
+def test_corpora_are_valid_and_seeded():
+    hands = bench_engine.winning_hands(50, random.Random(3))
+    assert hands == bench_engine.winning_hands(50, random.Random(3))
+    for s in hands:
+        counts = tile_engine.to_counts(s.hand_tiles + [s.winning_tile])
+        assert len(s.hand_tiles) == 16 and max(counts) <= 4 and tile_engine.is_standard_hu(counts)
+    for s in bench_engine.random_hands(50, random.Random(3)):
+        assert len(s.hand_tiles) == 16 and max(tile_engine.to_counts(s.hand_tiles + [s.winning_tile])) <= 4
+
+
+def test_pure_counts_are_every_one_suit_hand():
+    pure = bench_engine.pure_counts()
+    assert len(pure) == len(set(pure)) == 26414
+    assert all(sum(c) == 17 and max(c) <= 4 for c in pure)
+    assert all(tile_engine.is_standard_hu(bench_engine._pad(c)) for c in pure[::50])
+    worst = bench_engine.worst_counts(pure[:500], 3)
+    ways = [len(tile_engine.decompositions(bench_engine._pad(c))) for c in worst]
+    assert ways == sorted(ways, reverse=True)
+
+
+def test_bench_reports_every_call():
+    calls = []
+    r = bench_engine.bench(calls.append, [1, 2, 3], repeat=2)
+    assert set(r) == {'calls', 'ops_per_sec', 'p50_us', 'p99_us', 'peak_kib'}
+    assert r['calls'] == 6 and len(calls) == 3 + 6 + 3      # 暖身 + 計時 + 記憶體
+    assert r['p50_us'] <= r['p99_us']
+
+
+def test_run_names_results_by_case_and_corpus():
+    corpora = {'winning': bench_engine.winning_hands(5, random.Random(0))}
+    results = bench_engine.run(corpora, repeat=1, only=['rule_tai', 'calculate_tai'])
+    assert set(results) == {'calculate_tai/winning', 'rule_tai/winning'}
+
+
+def test_compare_flags_drops_beyond_threshold(capsys):
+    old = _report({'a/x': {'ops_per_sec': 1000.0}, 'b/x': {'ops_per_sec': 1000.0},
+                   'c/x': {'ops_per_sec': 1000.0}})
+    new = _report({'a/x': {'ops_per_sec': 950.0}, 'b/x': {'ops_per_sec': 800.0},
+                   'c/x': {'ops_per_sec': 2000.0}, 'd/x': {'ops_per_sec': 1.0}})
+    assert bench_engine.compare(old, new, 0.10) == [('b/x', 1000.0, 800.0, 0.8)]
+    assert [k for k, *_ in bench_engine.compare(old, new, 0.01)] == ['a/x', 'b/x']
+    assert '語料參數' not in capsys.readouterr().out
+    bench_engine.compare(old, _report({}, size=20), 0.10)
+    assert '語料參數 size 不同' in capsys.readouterr().out
@@ -0,0 +1,125 @@
+"""RoboflowClient 的重試/逾時行為，對本機替身 HTTP 伺服器測試"""
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import detector
+
+PREDICTIONS = [{'class': '1C', 'confidence': 0.9, 'x': 10, 'y': 10, 'width': 5, 'height': 5}]
+
+
+class StubServer:
+    """依序回應 script 中的 (狀態碼, 回應 dict, 延遲秒)，最後一項重複使用；記錄收到的請求"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                stub.requests.append((self.path, body))
+                status, payload, delay = stub.script[min(len(stub.requests), len(stub.script)) - 1]
+                if delay: time.sleep(delay)
+                data = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except OSError:     # 客戶端已逾時斷線
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def client(url, **kwargs):
+    options = {'connect_timeout': 1, 'read_timeout': 2, 'max_retries': 2, 'backoff': 0}
+    return detector.RoboflowClient("key", "model/1", base_url=url, **{**options, **kwargs})
+
+
+def free_port():
+    # 綁定後立即關閉，之後連這個 port 會被拒絕
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_success():
+    with StubServer([(200, {'predictions': PREDICTIONS}, 0)]) as stub:
+        c = client(stub.url)
+        assert c.detect(b"jpeg-bytes", "a.jpg") == PREDICTIONS
+    assert len(stub.requests) == 1
+    path, body = stub.requests[0]
+    assert path.startswith("/model/1?") and "api_key=key" in path
+    assert b"jpeg-bytes" in body
+    snap = c.stats.snapshot()
+    assert (snap['calls'], snap['errors'], snap['retries']) == (1, 0, 0)
+
+
+def test_5xx_then_retry_then_success():
+    script = [(503, {}, 0), (502, {}, 0), (200, {'predictions': PREDICTIONS}, 0)]
+    with StubServer(script) as stub:
+        c = client(stub.url)
+        assert c.detect(b"img") == PREDICTIONS
+    assert len(stub.requests) == 3
+    snap = c.stats.snapshot()
+    assert (snap['calls'], snap['errors'], snap['retries']) == (1, 0, 2)
+
+
+def test_5xx_exhausts_retries():
+    with StubServer([(500, {}, 0)]) as stub:
+        c = client(stub.url)
+        with pytest.raises(detector.DetectorError, match="500"):
+            c.detect(b"img")
+    assert len(stub.requests) == 3
+
+
+def test_4xx_not_retried():
+    with StubServer([(403, {'message': 'forbidden'}, 0)]) as stub:
+        with pytest.raises(detector.DetectorError, match="403"):
+            client(stub.url).detect(b"img")
+    assert len(stub.requests) == 1
+
+
+def test_connection_refused_raises_after_retries():
+    c = client(f"http://127.0.0.1:{free_port()}/")
+    with pytest.raises(detector.DetectorError, match="無法連線"):
+        c.detect(b"img")
+    snap = c.stats.snapshot()
+    assert (snap['calls'], snap['errors'], snap['retries']) == (1, 1, 2)
+
+
+def test_read_timeout_not_retried():
+    with StubServer([(200, {'predictions': PREDICTIONS}, 1.0)]) as stub:
+        c = client(stub.url, read_timeout=0.2)
+        start = time.perf_counter()
+        with pytest.raises(detector.DetectorError, match="逾時"):
+            c.detect(b"img")
+        assert time.perf_counter() - start < 0.9
+    assert len(stub.requests) == 1
+    assert c.stats.snapshot()['retries'] == 0
+
+
+def test_unknown_backend_is_detector_error():
+    with pytest.raises(detector.DetectorError, match="未知的辨識後端"):
+        detector.create_detector("robloflow")
@@ -0,0 +1,43 @@
+"""共用 LRU 與其兩個子類別的淘汰、計數行為"""
+import detection_cache
+import hand_memo
+from lru import LRUCache
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1        # a 變成最近使用
+    cache.put('c', 3)
+    assert 'b' not in cache and 'a' in cache and 'c' in cache
+    assert cache.get('b') is None
+    assert cache.stats() == {'entries': 2, 'max_entries': 2, 'hits': 1, 'misses': 1,
+                             'evictions': 1, 'hit_rate': 0.5}
+
+
+def test_get_or_compute_runs_once_per_key():
+    cache = LRUCache()
+    calls = []
+    for _ in range(3): cache.get_or_compute('k', lambda: calls.append(1) or 'v')
+    assert calls == [1] and (cache.hits, cache.misses) == (2, 1)
+    cache.clear()
+    assert len(cache) == 0 and cache.stats()['hit_rate'] is None
+
+
+def test_detection_cache_reloads_from_disk(tmp_path):
+    first = detection_cache.DetectionCache(max_entries=1, disk_dir=str(tmp_path))
+    first.put('x', [])                # 空清單也是有效的結果
+    first.put('y', [{'class': '1C'}])
+    assert 'x' not in first and first.evictions == 1
+    assert first.get('x') == [] and first.hits == 1
+    second = detection_cache.DetectionCache(disk_dir=str(tmp_path))
+    assert second.get('y') == [{'class': '1C'}] and 'y' in second
+    assert second.get('z') is None and (second.hits, second.misses) == (1, 1)
+
+
+def test_hand_memo_is_an_lru():
+    memo = hand_memo.HandMemo(max_entries=1)
+    memo.waits([0] * 34)
+    memo.waits([1] + [0] * 33)
+    assert len(memo) == 1 and memo.evictions == 1
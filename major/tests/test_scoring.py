@@ -0,0 +1,50 @@
+"""多種拆法時取台數最高者：111222333 可拆三刻或三順"""
+import scoring
+
+# 1萬~3萬 各三張 + 567筒 + 234條，胡 9條 將
+TRIPLE = '1萬 1萬 1萬 2萬 2萬 2萬 3萬 3萬 3萬 5筒 6筒 7筒 2條 3條 4條 9條'
+# 同上但少一張 3萬、多一張 9條，胡 3萬
+TRIPLE_WAIT_3 = '1萬 1萬 1萬 2萬 2萬 2萬 3萬 3萬 5筒 6筒 7筒 2條 3條 4條 9條 9條'
+PONGS = [{'type': '碰', 'tiles': ['5筒'] * 3}, {'type': '碰', 'tiles': ['7條'] * 3}]
+
+
+def tai(hand, win, exposed=(), flowers=(), **settings):
+    state = scoring.HandState(hand.split(), list(exposed), win, list(flowers),
+                              {**scoring.DEFAULT_SETTINGS, **settings})
+    return scoring.calculate_tai(state)
+
+
+def test_self_draw_reads_triplets():
+    # 有花不能平胡，三刻拆法 (三暗刻) 勝過三順
+    assert tai(TRIPLE, '9條', flowers=['春'], is_self_draw=True) == \
+        (6, ['三暗刻 (2台)', '門清自摸 (3台)', '花牌x1 (1台)'])
+
+
+def test_discard_on_triplet_is_not_concealed():
+    # 放槍胡 3萬：3萬 那刻不算暗刻，只剩兩暗刻，改拆三順拿平胡
+    assert tai(TRIPLE_WAIT_3, '3萬') == (2, ['平胡 (2台)'])
+    assert tai(TRIPLE_WAIT_3, '3萬', flowers=['春']) == (1, ['花牌x1 (1台)'])
+    assert tai(TRIPLE_WAIT_3, '3萬', flowers=['春'], is_self_draw=True) == \
+        (6, ['三暗刻 (2台)', '門清自摸 (3台)', '花牌x1 (1台)'])
+
+
+def test_pong_hand_reads_triplets():
+    # 有碰：三刻拆法同時拿三暗刻與碰碰胡
+    hand = '1萬 1萬 1萬 2萬 2萬 2萬 3萬 3萬 3萬 東'
+    assert tai(hand, '東', PONGS) == (6, ['三暗刻 (2台)', '碰碰胡 (4台)'])
+    # 放槍胡在刻子上：少一暗刻，碰碰胡仍成立
+    hand = '1萬 1萬 1萬 2萬 2萬 2萬 3萬 3萬 東 東'
+    assert tai(hand, '3萬', PONGS) == (4, ['碰碰胡 (4台)'])
+
+
+def test_best_decomposition_agrees():
+    counts = scoring.tile_engine.to_counts(TRIPLE.split() + ['9條'])
+    win = scoring.tile_engine.TILE_ID['9條']
+    score, an_ke, pattern, (pair, trips, chows) = scoring.best_decomposition(counts, win, True, False, False)
+    assert (score, an_ke, pattern) == (2, 3, scoring.PATTERN_NONE)
+    assert pair == win and trips == (0, 1, 2)
+    # 放槍胡 3萬：兩暗刻 (0台) 不如三順的平胡
+    counts = scoring.tile_engine.to_counts(TRIPLE_WAIT_3.split() + ['3萬'])
+    score, an_ke, pattern, (_, trips, chows) = scoring.best_decomposition(counts, 2, False, False, True)
+    assert (score, pattern, trips) == (2, scoring.PATTERN_PING, ())
+    assert sorted(chows)[:3] == [0, 0, 0]
@@ -0,0 +1,57 @@
+"""向聽數與實際聽牌一致：向聽 0 的手牌一定要有聽"""
+import random
+
+import shanten
+import tile_engine
+from tile_engine import NUM_TILES
+
+
+def _counts(names):
+    return tile_engine.to_counts(names.split())
+
+
+def _pairy_hand(rng, total=16):
+    # 均勻抽牌幾乎抽不到聽牌，偏重少數幾種牌、成對/成刻的手牌
+    kinds = rng.sample(range(NUM_TILES), 10)
+    c = [0] * NUM_TILES
+    while sum(c) < total:
+        i = rng.choice(kinds)
+        c[i] += min(rng.choice((1, 2, 2, 3)), 4 - c[i], total - sum(c))
+    return c
+
+
+def test_two_triplets_are_not_seven_pairs_ready():
+    c = _counts('1萬 1萬 3萬 3萬 5萬 5萬 7萬 7萬 9萬 9萬 1筒 1筒 1筒 5條 5條 5條')
+    assert tile_engine.ting_tiles(c, [0] * NUM_TILES) == []
+    assert shanten.seven_pairs_shanten(c) == 1
+    assert shanten.shanten(c, 5, True) > 0
+
+
+def test_one_triplet_waits_on_fourth_tile():
+    c = _counts('1萬 1萬 3萬 3萬 5萬 5萬 7萬 7萬 9萬 9萬 2筒 2筒 1筒 1筒 1筒 5條')
+    assert shanten.seven_pairs_shanten(c) == 0
+    assert tile_engine.TILE_ID['1筒'] in tile_engine.ting_tiles(c, [0] * NUM_TILES)
+
+
+def test_seventeen_tiles_discard_a_triplet_tile_first():
+    c = _counts('1萬 1萬 3萬 3萬 5萬 5萬 7萬 7萬 9萬 9萬 2筒 1筒 1筒 1筒 5條 5條 5條')
+    assert shanten.seven_pairs_shanten(c) == 0
+
+
+def test_wait_on_fifth_copy_is_not_ready():
+    # 四張 2筒 拆成刻子 + 單吊，只能等第 5 張
+    c = _counts('1萬 1萬 1萬 2筒 2筒 2筒 2筒 9筒 9筒 9筒 4條 4條 4條 7條 7條 7條')
+    assert shanten.standard_shanten(c, 5) == 0
+    assert tile_engine.ting_tiles(c, [0] * NUM_TILES) == []
+    assert shanten.shanten(c, 5, True) == 1
+
+
+def test_zero_shanten_implies_waits():
+    rng = random.Random(20240611)
+    ready = 0
+    for _ in range(3000):
+        c = _pairy_hand(rng)
+        if shanten.shanten(c, 5, True) != 0: continue
+        ready += 1
+        assert tile_engine.ting_tiles(c, [0] * NUM_TILES), tile_engine.from_counts(c)
+    assert ready > 50
@@ -0,0 +1,121 @@
+"""計數向量的胡牌 / 聽牌 / 七對子判斷"""
+import random
+
+import tile_engine
+from tile_engine import NUM_TILES, TILE_ID
+
+NO_USE = [0] * NUM_TILES
+
+
+def counts(names):
+    return tile_engine.to_counts(names.split())
+
+
+def ids(names):
+    return [TILE_ID[n] for n in names.split()]
+
+
+def _brute_hu(c):
+    # 不查表的對照：任選一對將，其餘逐格拆刻 / 順
+    def melds(c, i):
+        while i < NUM_TILES and not c[i]: i += 1
+        if i == NUM_TILES: return True
+        if c[i] >= 3:
+            c[i] -= 3; ok = melds(c, i); c[i] += 3
+            if ok: return True
+        if i < 27 and i % 9 < 7 and c[i + 1] and c[i + 2]:
+            c[i] -= 1; c[i + 1] -= 1; c[i + 2] -= 1
+            ok = melds(c, i)
+            c[i] += 1; c[i + 1] += 1; c[i + 2] += 1
+            if ok: return True
+        return False
+    c = list(c)
+    for i in range(NUM_TILES):
+        if c[i] >= 2:
+            c[i] -= 2; ok = melds(c, 0); c[i] += 2
+            if ok: return True
+    return False
+
+
+def test_counts_round_trip():
+    c = counts('3萬 1萬 中 9條 1萬')
+    assert c[TILE_ID['1萬']] == 2 and sum(c) == 5
+    assert tile_engine.from_counts(c) == ['1萬', '1萬', '3萬', '9條', '中']
+    # 34 種以外的名稱附加在後面，不輸出
+    c = counts('花 1萬 花')
+    assert len(c) == NUM_TILES + 1 and c[NUM_TILES] == 2
+    assert tile_engine.from_counts(c) == ['1萬']
+
+
+def test_standard_hu():
+    assert tile_engine.is_standard_hu(counts('1萬 2萬 3萬 4萬 5萬 6萬 7萬 8萬 9萬 1筒 1筒 1筒 5條 6條 7條 東 東'))
+    assert tile_engine.is_standard_hu(counts('1萬 1萬 1萬 2萬 2萬 2萬 3萬 3萬 3萬 4萬 4萬 中 中 中 白 白 白'))
+    # 張數對但拆不完
+    assert not tile_engine.is_standard_hu(counts('1萬 2萬 4萬 4萬 5萬 6萬 7萬 8萬 9萬 1筒 1筒 1筒 5條 6條 7條 東 東'))
+    # 字牌不能成順
+    assert not tile_engine.is_standard_hu(counts('東 南 西 1萬 1萬'))
+    # 張數不是 3n+2
+    assert not tile_engine.is_standard_hu(counts('1萬 1萬 1萬 2萬'))
+
+
+def test_table_matches_brute_force():
+    rng = random.Random(7)
+    pool = [i for i in range(NUM_TILES) for _ in range(4)]
+    for _ in range(2000):
+        c = [0] * NUM_TILES
+        kinds = rng.sample(range(NUM_TILES), 8)      # 集中在少數幾種牌才常胡
+        for i in rng.sample([i for i in pool if i in kinds], 14): c[i] += 1
+        assert tile_engine.is_standard_hu(c) == _brute_hu(c), tile_engine.from_counts(c)
+
+
+def test_nine_gates_waits_on_every_character():
+    c = counts('1萬 1萬 1萬 2萬 3萬 4萬 5萬 6萬 7萬 8萬 9萬 9萬 9萬 東 東 東')
+    assert tile_engine.ting_tiles(c, NO_USE) == list(range(9))
+    # 全場已用 4 張的牌不列入
+    used = list(c)
+    used[TILE_ID['5萬']] = 4
+    assert TILE_ID['5萬'] not in tile_engine.ting_tiles(c, used)
+
+
+def test_ting_tiles():
+    # 兩面聽
+    assert tile_engine.ting_tiles(counts('2萬 3萬 5筒 5筒'), NO_USE) == ids('1萬 4萬')
+    # 1112：聽 2 (刻 + 將) 與 3 (將 + 順)
+    assert tile_engine.ting_tiles(counts('1萬 1萬 1萬 2萬'), NO_USE) == ids('2萬 3萬')
+    # 單吊手上已有 4 張的牌：沒得聽
+    assert tile_engine.ting_tiles(counts('中 中 中 中'), NO_USE) == []
+    assert tile_engine.ting_tiles(counts('1萬 2萬 4萬 7筒'), NO_USE) == []
+
+
+def test_ting_tiles_matches_per_tile_check():
+    rng = random.Random(11)
+    for _ in range(1000):
+        c = [0] * NUM_TILES
+        kinds = rng.sample(range(NUM_TILES), 7)
+        while sum(c) < 16:
+            i = rng.choice(kinds)
+            if c[i] < 4: c[i] += 1
+        expect = [i for i in range(NUM_TILES)
+                  if c[i] < 4 and tile_engine.is_hu_for_ting(c[:i] + [c[i] + 1] + c[i + 1:])]
+        assert tile_engine.ting_tiles(c, NO_USE) == expect, tile_engine.from_counts(c)
+
+
+def test_seven_pairs():
+    eight = '1萬 1萬 3萬 3萬 5萬 5萬 7萬 7萬 2筒 2筒 4筒 4筒 6條 6條 東 東'
+    assert tile_engine.is_seven_pairs(counts(eight + ' 中'), 0)
+    # 4 張同牌算 2 對
+    assert tile_engine.is_seven_pairs(counts('1萬 1萬 1萬 1萬 5萬 5萬 7萬 7萬 2筒 2筒 4筒 4筒 6條 6條 東 東 中'), 0)
+    # 三張不算對子；有明牌不算
+    assert not tile_engine.is_seven_pairs(counts('1萬 1萬 1萬 5萬 5萬 7萬 7萬 2筒 2筒 4筒 4筒 6條 6條 東 東 中 中'), 0)
+    assert not tile_engine.is_seven_pairs(counts(eight + ' 中'), 1)
+    # 14 張 7 對
+    assert tile_engine.is_seven_pairs(counts(eight[:-4]), 0, total=14, need=7)
+
+
+def test_seven_pairs_waits():
+    # 16 張 7 對 + 2 單張：兩張單張都能胡 (17 張 8 對)
+    c = counts('1萬 1萬 3萬 3萬 5萬 5萬 7萬 7萬 2筒 2筒 4筒 4筒 6條 6條 東 中')
+    assert tile_engine.ting_tiles(c, NO_USE) == ids('東 中')
+    # 13 張 6 對 + 1 單張
+    c = counts('1萬 1萬 3萬 3萬 5萬 5萬 7萬 7萬 2筒 2筒 4筒 4筒 中')
+    assert tile_engine.ting_tiles(c, NO_USE) == ids('中')
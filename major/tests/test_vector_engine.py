@@ -0,0 +1,54 @@
+"""批次版聽牌 / 胡牌判斷與 tile_engine 逐手結果一致"""
+import random
+
+import numpy as np
+import pytest
+
+import tile_engine
+import vector_engine
+from tile_engine import NUM_TILES
+
+
+def _hands(seed, sizes, n=3000):
+    # 集中在少數幾種牌，胡 / 聽 / 七對子都會出現
+    rng = random.Random(seed)
+    hands = []
+    for _ in range(n):
+        size = rng.choice(sizes)
+        kinds = rng.sample(range(NUM_TILES), rng.randint(5, 9))
+        c = [0] * NUM_TILES
+        while sum(c) < size:
+            i = rng.choice(kinds)
+            c[i] += min(rng.choice((1, 2, 2, 3)), 4 - c[i], size - sum(c))
+        hands.append(c)
+    return hands
+
+
+def test_batch_hu_matches_tile_engine():
+    hands = _hands(1, (14, 17))
+    got = vector_engine.batch_hu(np.array(hands))
+    expect = [tile_engine.is_hu_for_ting(c) for c in hands]
+    assert got.tolist() == expect
+    assert 0 < sum(expect) < len(hands)
+
+
+def test_batch_waits_matches_ting_tiles():
+    rng = random.Random(2)
+    hands = _hands(2, (13, 16))
+    # 全場張數：手牌再加上隨機的明牌 / 棄牌，讓部分聽牌被 4 張上限濾掉
+    used = [[min(4, n + rng.choice((0, 0, 1, 2))) for n in c] for c in hands]
+    got = vector_engine.batch_waits(np.array(hands), np.array(used))
+    for row, c, u in zip(got, hands, used):
+        assert np.flatnonzero(row).tolist() == tile_engine.ting_tiles(c, u), tile_engine.from_counts(c)
+    assert got.any(axis=1).sum() > 100
+
+
+def test_wait_lists_and_defaults():
+    hands = [tile_engine.to_counts('1萬 1萬 1萬 2萬 3萬 4萬 5萬 6萬 7萬 8萬 9萬 9萬 9萬 東 東 東'.split())]
+    assert vector_engine.wait_lists(np.array(hands)) == [[f"{n}萬" for n in range(1, 10)]]
+
+
+def test_rejects_bad_input():
+    with pytest.raises(ValueError): vector_engine.batch_hu(np.zeros((2, 33), dtype=int))
+    with pytest.raises(ValueError): vector_engine.batch_hu(np.full((1, NUM_TILES), 5))
+    with pytest.raises(ValueError): vector_engine.counts_matrix([['1萬', '花']])
@@ -0,0 +1,414 @@
+"""整數牌編號引擎：以 34 格計數向量做胡牌/聽牌判斷，字串牌名只在進出時轉換"""
+import os
+import zlib
+from collections import Counter
+from functools import lru_cache
+
+# ==========================================
+# 1. 牌編號
+# ==========================================
+SUITS = ("萬", "筒", "條")
+HONORS = ("東", "南", "西", "北", "中", "發", "白")
+FLOWERS = ("春", "夏", "秋", "冬", "梅", "蘭", "竹", "菊")
+
+# 0-8 萬、9-17 筒、18-26 條、27-33 字
+TILE_NAMES = tuple(f"{n}{s}" for s in SUITS for n in range(1, 10)) + HONORS
+TILE_ID = {name: i for i, name in enumerate(TILE_NAMES)}
+NUM_TILES = len(TILE_NAMES)
+HONOR_START = 27
+
+# 花牌另用位元遮罩；API 只回傳籠統的「花」，佔第 9 個位元
+FLOWER_BIT = {name: 1 << i for i, name in enumerate(FLOWERS)}
+UNKNOWN_FLOWER_BIT = 1 << len(FLOWERS)
+
+
+def to_counts(tiles):
+    """字串牌 (list 或 Counter) -> 計數向量
+
+    不在 34 種內的名稱 (例如 AI 填入的「花」) 依序附加在第 34 格之後，
+    行為與字牌相同 (只能成刻/成對)，以維持和舊版字串判斷相同的結果。
+    """
+    counts = [0] * NUM_TILES
+    items = tiles.items() if isinstance(tiles, dict) else Counter(tiles).items()
+    extra = {}
+    for name, n in items:
+        if n <= 0: continue
+        idx = TILE_ID.get(name)
+        if idx is None:
+            extra[name] = extra.get(name, 0) + n
+        else:
+            counts[idx] += n
+    if extra:
+        counts.extend(extra[name] for name in sorted(extra))
+    return counts
+
+
+def from_counts(counts):
+    """計數向量 -> 依編號排序的字串牌 list (只輸出 34 種標準牌)"""
+    tiles = []
+    for idx in range(NUM_TILES):
+        if counts[idx]: tiles.extend([TILE_NAMES[idx]] * counts[idx])
+    return tiles
+
+
+def flower_mask(flowers):
+    """花牌 list -> 位元遮罩"""
+    mask = 0
+    for name in flowers:
+        mask |= FLOWER_BIT.get(name, UNKNOWN_FLOWER_BIT)
+    return mask
+
+
+def usage_counts(hand_tiles, exposed_tiles, winning_tile):
+    """全場 (手、明、胡) 各牌已使用張數的計數向量"""
+    used = to_counts(hand_tiles)[:NUM_TILES]
+    for item in exposed_tiles:
+        for name in item['tiles']:
+            idx = TILE_ID.get(name)
+            if idx is not None: used[idx] += 1
+    idx = TILE_ID.get(winning_tile)
+    if idx is not None: used[idx] += 1
+    return used
+
+# ==========================================
+# 2. 胡牌判斷 (計數向量)
+# ==========================================
+
+def _remove_sets(c, i):
+    # 由最小的牌開始拆刻子或順子，回溯後一律還原
+    n = len(c)
+    while i < n and not c[i]: i += 1
+    if i == n: return True
+    if c[i] >= 3:
+        c[i] -= 3
+        ok = _remove_sets(c, i)
+        c[i] += 3
+        if ok: return True
+    if i < HONOR_START and i % 9 < 7 and c[i + 1] and c[i + 2]:
+        c[i] -= 1; c[i + 1] -= 1; c[i + 2] -= 1
+        ok = _remove_sets(c, i)
+        c[i] += 1; c[i + 1] += 1; c[i + 2] += 1
+        if ok: return True
+    return False
+
+
+def _remove_sequences(c, i):
+    n = len(c)
+    while i < n and not c[i]: i += 1
+    if i == n: return True
+    if i < HONOR_START and i % 9 < 7 and c[i + 1] and c[i + 2]:
+        c[i] -= 1; c[i + 1] -= 1; c[i + 2] -= 1
+        ok = _remove_sequences(c, i)
+        c[i] += 1; c[i + 1] += 1; c[i + 2] += 1
+        if ok: return True
+    return False
+
+
+# ==========================================
+# 3. 拆牌查表 (每門 9 格 5 進位編碼)
+# ==========================================
+# 每個花色的 9 格張數 (0-4) 以 5 進位編成 0..5^9-1，表格每格一個位元組記錄能否拆解：
+#   MELDS/PAIR          全為面子 / 一對將 + 面子
+#   *_CHOW              同上但只用順子 (平胡用)
+MELDS, PAIR = 1, 2
+MELDS_CHOW, PAIR_CHOW = 4, 8
+SUIT_TABLE_SIZE = 5 ** 9
+HU_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hu_table.bin")
+
+# 字牌每張獨立，只能成刻或成對 (index 為張數)
+HONOR_FLAGS = (
+    MELDS | MELDS_CHOW, 0, PAIR | PAIR_CHOW, MELDS, 0,
+)
+_POW5 = tuple(5 ** i for i in range(9))
+
+
+def _reachable(melds):
+    # 從空牌逐次加入面子 (每格不超過 4 張)，回傳 {編碼: 各格張數}
+    seen = {0: (0,) * 9}
+    frontier = [0]
+    while frontier:
+        nxt = []
+        for code in frontier:
+            digits = seen[code]
+            for meld in melds:
+                if any(digits[i] + meld.count(i) > 4 for i in meld): continue
+                new_code = code + sum(_POW5[i] for i in meld)
+                if new_code not in seen:
+                    d = list(digits)
+                    for i in meld: d[i] += 1
+                    seen[new_code] = tuple(d)
+                    nxt.append(new_code)
+        frontier = nxt
+    return seen
+
+
+def build_hu_tables():
+    """建立每門 5^9 格的拆牌旗標表 (bytearray)"""
+    table = bytearray(SUIT_TABLE_SIZE)
+    pongs = [(i, i, i) for i in range(9)]
+    chows = [(i, i + 1, i + 2) for i in range(7)]
+    for reach, melds_bit, pair_bit in (
+        (_reachable(pongs + chows), MELDS, PAIR),
+        (_reachable(chows), MELDS_CHOW, PAIR_CHOW),
+    ):
+        for code, digits in reach.items():
+            table[code] |= melds_bit
+            for i in range(9):
+                if digits[i] <= 2: table[code + 2 * _POW5[i]] |= pair_bit
+    return table
+
+
+def save_hu_tables(path=HU_TABLE_PATH, table=None):
+    """壓縮後存成二進位檔，部署時可直接附上省去建表時間"""
+    with open(path, "wb") as f:
+        f.write(zlib.compress(bytes(table or build_hu_tables()), 9))
+
+
+def load_hu_tables(path=HU_TABLE_PATH):
+    """有附檔就讀檔，否則現場建表"""
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            table = bytearray(zlib.decompress(f.read()))
+        if len(table) == SUIT_TABLE_SIZE: return table
+    return build_hu_tables()
+
+
+_SUIT_TABLE = None
+
+def install_hu_tables(table):
+    """指定共用的拆牌表 (Streamlit 端由 st.cache_resource 提供)"""
+    global _SUIT_TABLE
+    _SUIT_TABLE = table
+
+
+def suit_table():
+    global _SUIT_TABLE
+    if _SUIT_TABLE is None: _SUIT_TABLE = load_hu_tables()
+    return _SUIT_TABLE
+
+
+def _group_flags(c):
+    """拆成三門 + 各字牌獨立的組，回傳 [(旗標, 張數)]；有超過 4 張者回傳 None"""
+    table = suit_table()
+    groups = []
+    for base in (0, 9, 18):
+        code = n = 0
+        for i in range(base + 8, base - 1, -1):
+            k = c[i]
+            if k > 4: return None
+            code = code * 5 + k; n += k
+        groups.append((table[code], n))
+    for i in range(HONOR_START, len(c)):
+        k = c[i]
+        if k > 4: return None
+        groups.append((HONOR_FLAGS[k], k))
+    return groups
+
+
+def _groups_ok(groups, melds_bit, pair_bit, pairs_needed):
+    # 張數餘 0 的組須全為面子，餘 2 的組須為將 + 面子，餘 1 必不成立
+    pairs = 0
+    for flags, n in groups:
+        r = n % 3
+        if r == 0:
+            if not flags & melds_bit: return False
+        elif r == 2:
+            if not flags & pair_bit: return False
+            pairs += 1
+        else:
+            return False
+    return pairs == pairs_needed
+
+
+def is_melds(counts):
+    """全部可拆成刻子/順子"""
+    groups = _group_flags(counts)
+    if groups is None: return _remove_sets(list(counts), 0)
+    return _groups_ok(groups, MELDS, PAIR, 0)
+
+
+def is_only_sequences(counts):
+    """全部可拆成順子"""
+    groups = _group_flags(counts)
+    if groups is None: return _remove_sequences(list(counts), 0)
+    return _groups_ok(groups, MELDS_CHOW, PAIR_CHOW, 0)
+
+
+def is_standard_hu(counts):
+    """一對將 + 其餘皆為面子"""
+    if sum(counts) % 3 != 2: return False
+    groups = _group_flags(counts)
+    if groups is not None: return _groups_ok(groups, MELDS, PAIR, 1)
+    c = list(counts)
+    for i in range(len(c)):
+        if c[i] >= 2:
+            c[i] -= 2
+            ok = _remove_sets(c, 0)
+            c[i] += 2
+            if ok: return True
+    return False
+
+
+def is_seven_pairs(counts, exposed_len, total=17, need=8):
+    """七對子 (預設 17 張需 8 對，4 張同牌算 2 對)"""
+    if exposed_len > 0: return False
+    if sum(counts) != total: return False
+    pairs = 0
+    for n in counts:
+        if n == 2: pairs += 1
+        elif n == 4: pairs += 2
+    return pairs == need
+
+
+def is_ping_hu(counts, flowers, has_open_pong):
+    """平胡：無花、無碰槓、無字，將以外全為順子"""
+    if flowers or has_open_pong: return False
+    groups = _group_flags(counts)
+    if groups is not None: return _groups_ok(groups, MELDS_CHOW, PAIR_CHOW, 1)
+    c = list(counts)
+    for i in range(len(c)):
+        if c[i] >= 2:
+            c[i] -= 2
+            ok = _remove_sequences(c, 0)
+            c[i] += 2
+            if ok: return True
+    return False
+
+
+def is_hu_for_ting(counts):
+    """聽牌檢測用：標準胡，或七對子 (14 張 7 對 / 17 張 8 對)"""
+    total = sum(counts)
+    if total % 3 != 2: return False
+    if is_standard_hu(counts): return True
+    return is_seven_pairs(counts, 0, total=total, need=total // 2)
+
+
+def ting_tiles(counts, used):
+    """回傳可胡的牌編號；used 為全場已使用張數，達 4 張者不列入
+
+    每多一張牌只會改變所屬的那一組，其餘組的狀態先算好，逐張只查一次表。
+    """
+    groups = _group_flags(counts)
+    c = list(counts)
+    waits = []
+    if groups is None or sum(c) % 3 != 1:
+        for idx in range(NUM_TILES):
+            if used[idx] >= 4: continue
+            c[idx] += 1
+            if is_hu_for_ting(c): waits.append(idx)
+            c[idx] -= 1
+        return waits
+
+    # 各組狀態：0 = 面子、1 = 將 + 面子、2 = 不成立
+    def status(flags, n):
+        r = n % 3
+        if r == 0: return 0 if flags & MELDS else 2
+        if r == 2: return 1 if flags & PAIR else 2
+        return 2
+    states = [status(f, n) for f, n in groups]
+    bad = states.count(2); pairs = states.count(1)
+    table = suit_table()
+    codes = []
+    for base in (0, 9, 18):
+        code = 0
+        for i in range(base + 8, base - 1, -1): code = code * 5 + c[i]
+        codes.append(code)
+    total = sum(c) + 1
+    seven = total in (14, 17)
+    for idx in range(NUM_TILES):
+        if used[idx] >= 4 or c[idx] >= 4: continue
+        if idx < HONOR_START:
+            g = idx // 9
+            flags, n = table[codes[g] + _POW5[idx % 9]], groups[g][1] + 1
+        else:
+            g = 3 + idx - HONOR_START
+            flags, n = HONOR_FLAGS[c[idx] + 1], c[idx] + 1
+        old, new = states[g], status(flags, n)
+        if bad - (old == 2) + (new == 2) == 0 and pairs - (old == 1) + (new == 1) == 1:
+            waits.append(idx)
+        elif seven:
+            c[idx] += 1
+            if is_seven_pairs(c, 0, total=total, need=total // 2): waits.append(idx)
+            c[idx] -= 1
+    return waits
+
+
+# ==========================================
+# 4. 拆解列舉 (算台用)
+# ==========================================
+# 一種拆法表示為 (將, 刻子 tuple, 順子起點 tuple)，皆為牌編號，無將時為 -1。
+# 各門以「張數 tuple」為 key 記憶化，同樣的花色型態只拆一次。
+
+@lru_cache(maxsize=8192)
+def _melds_of(digits):
+    """只含面子的所有拆法 (去重)，回傳 tuple of (刻子, 順子)，位置為組內索引"""
+    i = next((k for k, n in enumerate(digits) if n), None)
+    if i is None: return (((), ()),)
+    out = set()
+    if digits[i] >= 3:
+        rest = digits[:i] + (digits[i] - 3,) + digits[i + 1:]
+        for trips, chows in _melds_of(rest):
+            out.add((tuple(sorted((i,) + trips)), chows))
+    if i + 2 < len(digits) and digits[i + 1] and digits[i + 2]:
+        rest = digits[:i] + (digits[i] - 1, digits[i + 1] - 1, digits[i + 2] - 1) + digits[i + 3:]
+        for trips, chows in _melds_of(rest):
+            out.add((trips, tuple(sorted((i,) + chows))))
+    return tuple(sorted(out))
+
+
+@lru_cache(maxsize=8192)
+def _pair_melds_of(digits):
+    """一對將 + 面子的所有拆法，回傳 tuple of (將, 刻子, 順子)"""
+    out = []
+    for j, n in enumerate(digits):
+        if n < 2: continue
+        rest = digits[:j] + (n - 2,) + digits[j + 1:]
+        out.extend((j, trips, chows) for trips, chows in _melds_of(rest))
+    return tuple(out)
+
+
+def _group_slices(counts):
+    # 三門各 9 格，字牌 (及附加的未知牌) 每張自成一組
+    groups = [(base, 9) for base in (0, 9, 18)]
+    groups.extend((i, 1) for i in range(HONOR_START, len(counts)))
+    return groups
+
+
+def group_decompositions(counts):
+    """每組所有可能拆法 (編號已換成全域)，任何一組拆不開則回傳 None
+
+    張數餘 0 的組只拆面子，餘 2 的組必含將；整手恰好一組有將才算胡。
+    """
+    if sum(counts) % 3 != 2: return None
+    result = []
+    pairs = 0
+    for base, size in _group_slices(counts):
+        digits = tuple(counts[base:base + size])
+        r = sum(digits) % 3
+        if r == 1: return None
+        if r == 0:
+            options = [(-1, tuple(base + t for t in trips), tuple(base + c for c in chows))
+                       for trips, chows in _melds_of(digits)]
+        else:
+            pairs += 1
+            options = [(base + p, tuple(base + t for t in trips), tuple(base + c for c in chows))
+                       for p, trips, chows in _pair_melds_of(digits)]
+        if not options: return None
+        result.append(options)
+    return result if pairs == 1 else None
+
+
+def decompositions(counts):
+    """列出整手 (一對將 + 面子) 的所有拆法"""
+    groups = group_decompositions(counts)
+    if groups is None: return []
+    out = [(-1, (), ())]
+    for options in groups:
+        out = [(p if p >= 0 else q, trips + t2, chows + c2)
+               for p, trips, chows in out for q, t2, c2 in options]
+    return out
+
+
+if __name__ == "__main__":
+    save_hu_tables()
+    print(f"已輸出 {HU_TABLE_PATH}")
@@ -0,0 +1,91 @@
+"""分塊辨識：高解析度桌面照片切成重疊的區塊，同時送辨識後再合併 (不依賴 Streamlit)
+
+整張照片縮到模型輸入尺寸後，17 張手牌加明牌每張只剩幾個像素。切成 rows × cols 塊、
+每塊各自縮到輸入尺寸，等於把解析度放大數倍；各塊用共用的執行緒池並行送出，
+總耗時約等於最慢的那一個請求。
+"""
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+import image_prep
+from detection_cache import intersection
+
+
+def crop_boxes(width, height, rows, cols, overlap_ratio):
+    """切塊座標 [(x0, y0, x1, y1)]，相鄰塊重疊 overlap_ratio (以塊寬/高計)"""
+    tile_w = width / (cols - (cols - 1) * overlap_ratio)
+    tile_h = height / (rows - (rows - 1) * overlap_ratio)
+    step_x, step_y = tile_w * (1 - overlap_ratio), tile_h * (1 - overlap_ratio)
+    boxes = []
+    for r in range(rows):
+        for c in range(cols):
+            x0, y0 = round(c * step_x), round(r * step_y)
+            boxes.append((x0, y0, min(width, round(x0 + tile_w)), min(height, round(y0 + tile_h))))
+    return boxes
+
+
+def _intersection_over_smaller(a, b):
+    inter = intersection(a, b)
+    if not inter: return 0.0
+    return inter / min(a['width'] * a['height'], b['width'] * b['height'])
+
+
+def merge_crops(per_crop, threshold=0.6):
+    """合併各塊結果：只在「不同塊」之間去重 (重疊區同一張牌會被兩塊都看到，
+    切邊的那塊通常框較小)，以交集 / 較小框面積判斷，保留信心度高者。
+    同一塊內的重疊交給之後的 NMS 依使用者設定處理。
+    """
+    tagged = [(p, i) for i, preds in enumerate(per_crop) for p in preds]
+    tagged.sort(key=lambda t: -t[0]['confidence'])
+    kept = []
+    for p, i in tagged:
+        if all(j == i or _intersection_over_smaller(k, p) < threshold for k, j in kept):
+            kept.append((p, i))
+    return [p for p, _ in kept]
+
+
+class TiledDetector:
+    """包裝一般 detector：detect() 介面相同，可直接給 detection_cache.detect 使用"""
+
+    def __init__(self, client, rows=2, cols=2, overlap_ratio=0.2, max_workers=4,
+                 max_side=image_prep.MODEL_INPUT_SIZE, quality=image_prep.JPEG_QUALITY):
+        self.client = client
+        self.rows, self.cols = rows, cols
+        self.overlap_ratio = overlap_ratio
+        self.max_side, self.quality = max_side, quality
+        # 快取 key 要和整張辨識區分
+        self.model_id = f"{client.model_id}|tiled-{rows}x{cols}"
+        self.stats = client.stats
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tile-detect")
+
+    def _encode_crops(self, file_bytes):
+        with Image.open(io.BytesIO(file_bytes)) as img:
+            img = ImageOps.exif_transpose(img)
+            if img.mode != "RGB": img = img.convert("RGB")
+            crops = []
+            for box in crop_boxes(img.width, img.height, self.rows, self.cols, self.overlap_ratio):
+                crop = img.crop(box)
+                scale = 1.0
+                longest = max(crop.size)
+                if longest > self.max_side:
+                    scale = longest / self.max_side
+                    crop = crop.resize((round(crop.width / scale), round(crop.height / scale)), Image.LANCZOS)
+                    scale = (box[2] - box[0]) / crop.width
+                out = io.BytesIO()
+                crop.save(out, format="JPEG", quality=self.quality, optimize=True)
+                crops.append((out.getvalue(), scale, box[0], box[1]))
+        return crops
+
+    def _detect_crop(self, crop, filename, confidence, overlap):
+        data, scale, dx, dy = crop
+        preds = self.client.detect(data, os.path.splitext(filename)[0] + ".jpg", confidence=confidence, overlap=overlap)
+        return image_prep.scale_predictions(preds, scale, dx, dy)
+
+    def detect(self, file_bytes, filename="image.jpg", confidence=40, overlap=30, content_type="image/jpeg"):
+        """切塊 → 並行辨識 → 換回整張座標並合併；任一塊失敗即丟出該錯誤"""
+        crops = self._encode_crops(file_bytes)
+        futures = [self._pool.submit(self._detect_crop, crop, filename, confidence, overlap) for crop in crops]
+        return merge_crops([f.result() for f in futures])
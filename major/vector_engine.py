@@ -0,0 +1,110 @@
+"""NumPy 批次版聽牌/胡牌判斷：一次處理 (N, 34) 的計數矩陣 (不依賴 Streamlit)
+
+規則與 tile_engine.ting_tiles / is_hu_for_ting 相同 (標準胡 + 14 張 / 17 張七對子)，
+查的也是同一張每門 5^9 格旗標表，只是把「逐手、逐張」的迴圈換成整批陣列運算：
+  1. 每手拆成三門 + 7 張字牌共 10 組，查表得到各組狀態 (面子 / 將 + 面子 / 不成立)
+  2. 多摸一張只改變所屬那一組：34 種摸牌的新狀態一次查出 (N, 34)
+  3. 不成立組數 0 且將 1 組即胡；另以對子數的增量判斷七對子
+"""
+import numpy as np
+
+import tile_engine
+from tile_engine import HONOR_FLAGS, HONOR_START, MELDS, NUM_TILES, PAIR
+
+_POW5 = 5 ** np.arange(9, dtype=np.int64)
+_HONOR_FLAGS = np.array(HONOR_FLAGS, dtype=np.uint8)
+# 每張牌所屬的組：0-2 為三門，3-9 為各字牌
+_GROUP_OF = np.concatenate([np.repeat(np.arange(3), 9), 3 + np.arange(NUM_TILES - HONOR_START)])
+# 某張牌由 n 張變 n+1 張時對子數的變化 (2 張算 1 對、4 張算 2 對)
+_PAIR_DELTA = np.array([0, 1, -1, 2, 0], dtype=np.int64)
+
+_TABLE = (None, None)     # (來源 bytearray, 陣列)
+
+
+def suit_table_array():
+    """拆牌表的 uint8 陣列 (與 tile_engine 共用同一份記憶體)"""
+    global _TABLE
+    table = tile_engine.suit_table()
+    if _TABLE[0] is not table:
+        _TABLE = (table, np.frombuffer(table, dtype=np.uint8))
+    return _TABLE[1]
+
+
+def counts_matrix(hands):
+    """多手字串牌 (list 或 Counter) -> (N, 34) 計數矩陣；不支援 34 種以外的名稱"""
+    out = np.zeros((len(hands), NUM_TILES), dtype=np.int8)
+    for row, tiles in zip(out, hands):
+        counts = tile_engine.to_counts(tiles)
+        if len(counts) > NUM_TILES: raise ValueError("含有 34 種以外的牌名")
+        row[:] = counts
+    return out
+
+
+def _check(counts):
+    c = np.asarray(counts)
+    if c.ndim != 2 or c.shape[1] != NUM_TILES: raise ValueError(f"需要 (N, {NUM_TILES}) 的計數矩陣")
+    c = c.astype(np.int64, copy=False)
+    if c.size and (c.min() < 0 or c.max() > 4): raise ValueError("每種牌張數須為 0-4")
+    return c
+
+
+def _states(flags):
+    # 0 = 面子、1 = 將 + 面子、2 = 不成立 (表格保證面子與將不會同時成立)
+    return np.where(flags & MELDS, 0, np.where(flags & PAIR, 1, 2))
+
+
+def _group_states(c):
+    """(N, 10) 各組狀態，以及三門的 5 進位編碼 (N, 3)"""
+    codes = c[:, :HONOR_START].reshape(len(c), 3, 9) @ _POW5
+    flags = np.concatenate([suit_table_array()[codes], _HONOR_FLAGS[c[:, HONOR_START:]]], axis=1)
+    return _states(flags), codes
+
+
+def _pairs(c):
+    return (c == 2).sum(axis=1) + 2 * (c == 4).sum(axis=1)
+
+
+def batch_hu(counts):
+    """(N, 34) -> (N,) bool，同 tile_engine.is_hu_for_ting"""
+    c = _check(counts)
+    states, _ = _group_states(c)
+    standard = ((states == 2).sum(axis=1) == 0) & ((states == 1).sum(axis=1) == 1)
+    total = c.sum(axis=1)
+    seven = ((total == 14) | (total == 17)) & (_pairs(c) == total // 2)
+    return standard | seven
+
+
+def batch_waits(counts, used=None):
+    """(N, 34) 手牌 -> (N, 34) bool，第 j 欄為摸到第 j 種牌是否胡
+
+    used 為全場已使用張數 (手牌 + 明牌 + 胡牌，同 tile_engine.ting_tiles)，
+    達 4 張者不列入；未給時只看手牌本身。
+    """
+    c = _check(counts)
+    used = c if used is None else _check(used)
+    n = len(c)
+    states, codes = _group_states(c)
+    bad = (states == 2).sum(axis=1)
+    pairs = (states == 1).sum(axis=1)
+
+    addable = c < 4
+    # 三門：原編碼加上該格的 5^k；已有 4 張的格不可加 (改查 0 號格避免越界，之後遮掉)
+    suit_codes = codes[:, :, None] + _POW5
+    suit_codes = np.where(addable[:, :HONOR_START].reshape(n, 3, 9), suit_codes, 0).reshape(n, HONOR_START)
+    new_flags = np.concatenate([suit_table_array()[suit_codes],
+                                _HONOR_FLAGS[np.minimum(c[:, HONOR_START:] + 1, 4)]], axis=1)
+    new = _states(new_flags)
+    old = states[:, _GROUP_OF]
+    bad_after = bad[:, None] - (old == 2) + (new == 2)
+    pairs_after = pairs[:, None] - (old == 1) + (new == 1)
+    standard = (bad_after == 0) & (pairs_after == 1)
+
+    total = c.sum(axis=1) + 1
+    seven = ((total == 14) | (total == 17))[:, None] & ((_pairs(c)[:, None] + _PAIR_DELTA[c]) == (total // 2)[:, None])
+    return (standard | seven) & addable & (used < 4)
+
+
+def wait_lists(counts, used=None):
+    """batch_waits 的結果轉成每手的牌名 list"""
+    names = np.array(tile_engine.TILE_NAMES)
+    return [names[row].tolist() for row in batch_waits(counts, used)]